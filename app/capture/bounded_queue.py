@@ -0,0 +1,66 @@
+from __future__ import annotations
+from contextlib import suppress
+from multiprocessing.context import BaseContext
+from queue import Empty, Full
+from typing import Generic, TypeVar
+from app.datastructures import QueuePolicy, QueueStats
+
+__all__ = ["BoundedQueue"]
+
+T = TypeVar("T")
+
+
+class BoundedQueue(Generic[T]):
+    def __init__(self, ctx: BaseContext, maxsize: int, policy: QueuePolicy) -> None:
+        """Bounded multiprocessing queue with an overflow policy
+
+        The drop and high water counters are kept by the producer process.
+
+        Args:
+            ctx (BaseContext): Multiprocessing context.
+            maxsize (int): Maximum number of queued items.
+            policy (QueuePolicy): Action on a full queue, "drop_oldest" discards the
+                oldest queued item, "drop_newest" discards the item being put and
+                "block" waits for space.
+        """
+        self._queue = ctx.Queue(maxsize)  # type: ignore
+        self.policy = policy
+        self.stats = QueueStats()
+
+    def put(self, item: T) -> None:
+        """Put an item on the queue, applying the overflow policy if full
+
+        Args:
+            item (T): Item to queue.
+        """
+        if self.policy == "block":
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except Full:
+                self.stats.drops += 1
+                if self.policy == "drop_oldest":
+                    # The queue is full, so the oldest item only waits on the feeder thread
+                    with suppress(Empty):
+                        self._queue.get(timeout=1.0)
+                    with suppress(Full):
+                        self._queue.put_nowait(item)
+        self.stats.high_water = max(self.stats.high_water, self._queue.qsize())
+
+    def get_nowait(self) -> T | None:
+        """Get an item without waiting
+
+        Returns:
+            T | None: The oldest item or None if the queue is empty.
+        """
+        try:
+            return self._queue.get_nowait()
+        except Empty:
+            return None
+
+    def close(self) -> None:
+        self._queue.close()
+
+    def join_thread(self) -> None:
+        self._queue.join_thread()
@@ -1,21 +1,62 @@
+from __future__ import annotations
 import asyncio
 import time
+from typing import List, Set
 from loguru import logger
-from app.datastructures import AppConfig, CaptureUpdate, CaptureMetrics
+from app.datastructures import (
+    AppConfig,
+    CameraOptions,
+    CaptureUpdate,
+    CaptureMetrics,
+    DetectionData,
+    VideoFrame,
+    WATCHDOG_INTERVAL_S,
+)
 from app.events import Event, Publisher, Topic
-from .detection_process import DetectionProcess
+from app.exceptions import AlgorithmNotFound
+from .detection_process import (
+    DetectionProcess,
+    assign_cores,
+    LIVE_STREAM,
+    RECORDING_STREAM,
+    SNAPSHOT_STREAM,
+)
 
 
 __all__ = ["run_detection_task"]
 
 
 class Capture:
-    def __init__(self, config: AppConfig, publisher: Publisher):
+    def __init__(
+        self,
+        config: AppConfig,
+        publisher: Publisher,
+        camera: CameraOptions,
+        cores: Set[int] | None = None,
+    ):
+        """Capture of a single camera
+
+        Runs the camera's detection process and publishes its video and detection
+        updates, all events are keyed by the camera name.
+
+        Args:
+            config (AppConfig): Application config
+            publisher (Publisher): Application publisher
+            camera (CameraOptions): Camera to capture
+            cores (Set[int] | None, optional): CPU cores of the detection process
+        """
         self.config = config
         self.publisher = publisher
-        self.process = DetectionProcess(config)
-        self.watchdog_interval_s: float = 30
+        self.camera = camera
+        self.camera_id = camera.name
+        self.cores = cores
+        self.process = DetectionProcess(config, camera, cores)
+        self.watchdog_interval_s = WATCHDOG_INTERVAL_S
         self.last_watchdog_update = time.time()
+        self.frames_dropped = 0
+        self.frames_backlogged = 0
+        self.capture_stopped = False
+        self.live_viewers = 0
         self._subscribe()
 
     def _subscribe(self):
@@ -23,65 +64,184 @@ class Capture:
             Topic.SCHEDULER_CAPTURE_STOP, self._scheduler_update_handler
         )
         self.publisher.subscribe(Topic.SYSTEM_CONFIG_UPDATE, self.config_update_handler)
+        self.publisher.subscribe(
+            Topic.VIDEO_VIEWERS_UPDATE, self._video_viewers_update_handler
+        )
 
     def _scheduler_update_handler(self, evt: Event):
-        stop: bool = evt.data  # reversed
-        self.process.send_msg((CaptureUpdate(stop_processing=stop, sensitivity=50)))
+        self.capture_stopped = evt.data  # reversed
+        self._send_capture_update()
+
+    def _video_viewers_update_handler(self, evt: Event):
+        if evt.camera_id != self.camera_id:
+            return
+        live_viewers: int = evt.data
+        if live_viewers != self.live_viewers:
+            self.live_viewers = live_viewers
+            self._send_capture_update()
+
+    def _send_capture_update(self):
+        self.process.send_msg(
+            CaptureUpdate(
+                stop_processing=self.capture_stopped,
+                sensitivity=50,
+                stream_required=self.live_viewers > 0,
+            )
+        )
 
     def config_update_handler(self, event: Event):
         new_config: AppConfig = event.data
+        old_config, old_camera = self.config, self.camera
         self.config = new_config
-        self._update_process_config(new_config)
+        for camera in new_config.camera:
+            if camera.name == self.camera_id:
+                self.camera = camera
+                break
+        else:
+            logger.warning(
+                f"The {self.camera_id} camera was removed, a restart is required to"
+                " stop it"
+            )
+        try:
+            self._update_process_config(new_config)
+        except AlgorithmNotFound as ex:
+            logger.error(f"Detection config not applied: {ex}")
+            self.config, self.camera = old_config, old_camera
 
     async def run(self):
-        logger.info("Starting detection process")
-        self.process.start()
+        logger.info(f"Starting detection process for the {self.camera_id} camera")
+        self._start_process(self.process)
         try:
             while True:
-                if video_data := self.process.get_video_data():
-                    self.publisher.send_message(
-                        Topic.VIDEO_RAW_UPDATE, Event(data=video_data)
-                    )
-                if status_data := self.process.get_status_data():
-                    self.publisher.send_message(
-                        Topic.CAPTURE_METRICS_UPDATE,
-                        Event(
-                            data=CaptureMetrics(
-                                pid=status_data.pid,
-                                frame_processing_times=status_data.frame_processing_times,
-                            )
-                        ),
-                    )
-                    self.publisher.send_message(
-                        Topic.CAPTURE_DETECTION_UPDATE,
-                        Event(data=status_data.motion_detected),
-                    )
-                    self.last_watchdog_update = time.time()
+                # Frames are handled as they arrive, this only catches a stalled process
+                await asyncio.sleep(1.0)
+                self._read_status_data()
                 if check_watchdog_expired(
                     self.last_watchdog_update, self.watchdog_interval_s
                 ):
                     logger.error(
-                        "The watchdog timer expired for the detection process, restarting process"
+                        f"The watchdog timer expired for the {self.camera_id}"
+                        " detection process, restarting process"
                     )
-                    self.process.shutdown()
-                    self.process = DetectionProcess(self.config)
-                    self.process.start()
-                    self.last_watchdog_update = time.time()
-                await asyncio.sleep(0.033)  # 30 fps TODO: Make variable
+                    self._restart_process(self.config)
         finally:
-            self.process.shutdown()
+            self._stop_process(self.process)
+
+    def _data_ready_handler(self):
+        self.process.clear_notifications()
+        live_frames = self._get_video_frames(LIVE_STREAM)
+        if live_frames:
+            # Live viewers only want the newest frame
+            self.frames_backlogged += len(live_frames) - 1
+            self.publisher.send_message(
+                Topic.VIDEO_RAW_UPDATE,
+                Event(data=live_frames[-1].data, camera_id=self.camera_id),
+            )
+        if snapshot_frames := self._get_video_frames(SNAPSHOT_STREAM):
+            self.publisher.send_message(
+                Topic.VIDEO_SNAPSHOT_UPDATE,
+                Event(data=snapshot_frames[-1].data, camera_id=self.camera_id),
+            )
+        # The recording needs every frame
+        if recording_frames := self._get_video_frames(RECORDING_STREAM):
+            self.publisher.send_message(
+                Topic.VIDEO_RECORD_UPDATE,
+                Event(data=recording_frames, camera_id=self.camera_id),
+            )
+        self._read_status_data()
+
+    def _get_video_frames(self, stream: str) -> List[VideoFrame]:
+        frames, dropped = self.process.get_video_frames(stream)
+        self.frames_dropped += dropped
+        return frames
+
+    def _read_status_data(self):
+        status_data: DetectionData | None = None
+        frame_processing_times: List[float] = []
+        frame_read_times: List[float] = []
+        while data := self.process.get_status_data():
+            status_data = data
+            frame_processing_times.extend(data.frame_processing_times)
+            frame_read_times.extend(data.frame_read_times)
+        if status_data is None:
+            return
+        self.publisher.send_message(
+            Topic.CAPTURE_METRICS_UPDATE,
+            Event(
+                data=CaptureMetrics(
+                    pid=status_data.pid,
+                    frame_processing_times=frame_processing_times,
+                    frames_dropped=self.frames_dropped,
+                    frames_backlogged=self.frames_backlogged,
+                    queue_stats=status_data.queue_stats,
+                    frame_read_times=frame_read_times,
+                    motion_energy=status_data.motion_energy,
+                ),
+                camera_id=self.camera_id,
+            ),
+        )
+        self.frames_dropped = 0
+        self.frames_backlogged = 0
+        self.publisher.send_message(
+            Topic.CAPTURE_DETECTION_UPDATE,
+            Event(data=status_data.motion_detected, camera_id=self.camera_id),
+        )
+        self.last_watchdog_update = time.time()
+
+    def _start_process(self, process: DetectionProcess) -> None:
+        process.start()
+        self._send_capture_update()
+        asyncio.get_event_loop().add_reader(process.notify_fd, self._data_ready_handler)
+        self.last_watchdog_update = time.time()
+
+    def _stop_process(self, process: DetectionProcess) -> None:
+        asyncio.get_event_loop().remove_reader(process.notify_fd)
+        process.shutdown()
+
+    def _restart_process(self, config: AppConfig) -> None:
+        # Created first so an invalid config leaves the running process untouched
+        process = DetectionProcess(config, self.camera, self.cores)
+        self._stop_process(self.process)
+        self.process = process
+        self._start_process(self.process)
 
     def _update_process_config(self, config: AppConfig) -> None:
         # TODO: This is a bit of a heavy hand approach here
         logger.debug("Updating detection process config")
-        self.process.shutdown()
-        self.process = DetectionProcess(config)
-        self.process.start()
+        self._restart_process(config)
 
 
 async def run_detection_task(config: AppConfig, publisher: Publisher) -> None:
-    process = Capture(config, publisher)
-    await process.run()
+    """Run a capture for each configured camera
+
+    Args:
+        config (AppConfig): Application config
+        publisher (Publisher): Application publisher
+    """
+    count = len(config.camera)
+    captures = [
+        Capture(
+            config,
+            publisher,
+            camera,
+            assign_cores(index, count, config.processing.max_cores),
+        )
+        for index, camera in enumerate(config.camera)
+    ]
+
+    def config_update_handler(event: Event) -> None:
+        # Each capture follows the update of its own camera, new cameras have none
+        new_config: AppConfig = event.data
+        running = {capture.camera_id for capture in captures}
+        for camera in new_config.camera:
+            if camera.name not in running:
+                logger.warning(
+                    f"The {camera.name} camera was added, a restart is required to"
+                    " start it"
+                )
+
+    publisher.subscribe(Topic.SYSTEM_CONFIG_UPDATE, config_update_handler)
+    await asyncio.gather(*(capture.run() for capture in captures))
 
 
 def check_watchdog_expired(last_watchdog_update, watchdog_interval_s) -> bool:
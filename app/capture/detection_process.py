@@ -1,22 +1,45 @@
 from __future__ import annotations
+from contextlib import suppress
 from copy import copy
 import multiprocessing as mp
-from queue import Empty
+import os
 import signal
 import time
-from typing import List
+from typing import Dict, List, Set, Tuple
 from loguru import logger
+import cv2 as cv
 import numpy as np
 import numpy.typing as npt
-from app.exceptions import CaptureError
-from app.detection import BasicDetectionAlgorithm
-from app.datastructures import AppConfig, DetectionData, CaptureUpdate
+from app.exceptions import CaptureError, FrameBufferError
+from app.detection import create_detection_algorithm, scale_to_detection_width
+from app.datastructures import (
+    AppConfig,
+    CameraOptions,
+    DetectionData,
+    CaptureUpdate,
+    EncodeProfile,
+    VideoFrame,
+)
 from app.bootstrap.logger import set_log_level
-from .filter import BilateralFilter, GuassianBlurFilter
+from .filter import create_filter
+from .bounded_queue import BoundedQueue
 from .device import CaptureDevice, CameraCaptureDevice, FileCaptureDevice
+from .frame_buffer import SharedFrameBuffer
 from .helpers import resize_mat, to_gray_scale, mat_to_bytes
+from .pipeline import FramePipeline
 
-__all__ = ["DetectionProcess"]
+__all__ = [
+    "DetectionProcess",
+    "assign_cores",
+    "init_pipeline",
+    "LIVE_STREAM",
+    "SNAPSHOT_STREAM",
+    "RECORDING_STREAM",
+]
+
+LIVE_STREAM = "live"
+SNAPSHOT_STREAM = "snapshot"
+RECORDING_STREAM = "recording"
 
 
 def sig_term_handler(*_):
@@ -27,38 +50,88 @@ class DetectionProcess:
     def __init__(
         self,
         config: AppConfig,
+        camera: CameraOptions,
+        cores: Set[int] | None = None,
     ) -> None:
+        """Motion detection process of a single camera
+
+        Args:
+            config (AppConfig): Application config.
+            camera (CameraOptions): Camera to capture.
+            cores (Set[int] | None, optional): CPU cores the process is restricted to,
+                None is unrestricted.
+        """
         super().__init__()
+        # Created first, an unknown algorithm fails before any resources are allocated
+        self.detection_algo = create_detection_algorithm(config)
         ctx = mp.get_context("spawn")
-        self.msg_queue: "mp.Queue[CaptureUpdate]" = ctx.Queue()
-        self.status_queue: "mp.Queue[DetectionData]" = ctx.Queue()
-        self.raw_video_queue: "mp.Queue[bytes]" = ctx.Queue()
-        self.queues: List[mp.Queue] = [
+        options = config.processing
+        # Each message carries the full capture state so only the newest matters
+        self.msg_queue: BoundedQueue[CaptureUpdate] = BoundedQueue(
+            ctx, options.queue_size, "drop_oldest"
+        )
+        self.status_queue: BoundedQueue[DetectionData] = BoundedQueue(
+            ctx, options.queue_size, options.queue_policy
+        )
+        self.encode_profiles: Dict[str, EncodeProfile] = {
+            LIVE_STREAM: config.server.live_profile,
+            SNAPSHOT_STREAM: config.server.snapshot_profile,
+            RECORDING_STREAM: config.server.recording_profile,
+        }
+        self.frame_buffers: Dict[str, SharedFrameBuffer] = {
+            stream: SharedFrameBuffer(
+                slots=options.queue_size,
+                slot_size=max_encoded_size(profile),
+                policy=options.queue_policy,
+            )
+            for stream, profile in self.encode_profiles.items()
+        }
+        self.last_frame_seqs: Dict[str, int] = {
+            stream: 0 for stream in self.frame_buffers
+        }
+        # Wakes the main process event loop when a frame or status update is ready
+        self._notify_reader, self._notify_writer = ctx.Pipe(duplex=False)
+        self.queues: List[BoundedQueue] = [
             self.msg_queue,
             self.status_queue,
-            self.raw_video_queue,
         ]
         self.config = config
+        self.camera = camera
+        self.cores = cores
         self.detection_running = True
         self.sensitivity = 0  # TODO: Needed
+        # Encode every frame until the main process says nobody is watching
+        self.stream_required = True
+        self.keyframe_interval_s = config.processing.keyframe_interval_s
+        self.last_encode_times: Dict[str, float] = {
+            stream: 0.0 for stream in self.frame_buffers
+        }
         self.process_fps = 1 / config.processing.fps
+        # Zero is the camera frame rate
+        stream_fps = config.processing.stream_fps
+        self.stream_interval_s = 1 / stream_fps if stream_fps else 0.0
         self.last_heartbeat = 0.0
-        self.filter = GuassianBlurFilter(ksize=config.processing.gauss_ksize)
-        self.capture_device = init_capture_device(config)
+        self.pipeline = init_pipeline(config, camera)
+        self.capture_device = init_capture_device(config, camera)
         self.last_capture_time: float = 0.0
-        # self.filter = BilateralFilter(5, 200, 200)
-        self.detection_algo = BasicDetectionAlgorithm(config)
         self.alarm_threshold_reached = False
         self.process_times: List[float] = []
         self.detection_process = ctx.Process(
-            target=self._perform_detection, name="DetectionProcess", daemon=True
+            target=self._perform_detection,
+            name=f"DetectionProcess-{camera.name}",
+            daemon=True,
         )
 
     def _perform_detection(self):
         set_log_level(self.config.flags.log_level)
         signal.signal(signal.SIGINT, signal.SIG_IGN)
         signal.signal(signal.SIGTERM, sig_term_handler)
-        logger.debug("Starting detection process")
+        # Never stall the capture on a full pipe, the reader is already awake
+        os.set_blocking(self._notify_writer.fileno(), False)
+        if self.cores:
+            os.sched_setaffinity(0, self.cores)
+            cv.setNumThreads(len(self.cores))
+        logger.debug(f"Starting detection process for the {self.camera.name} camera")
         while True:
             try:
                 self._process()
@@ -69,28 +142,89 @@ class DetectionProcess:
                 time.sleep(1.0)
 
     def _process(self):
-        for mat in self.capture_device.capture():
+        for mat in self.capture_device.capture(self._frame_required):
             process_start = time.perf_counter()
-            mat = to_gray_scale(resize_mat(mat))
-            raw = mat_to_bytes(mat)
-            self.raw_video_queue.put_nowait(raw)
+            colour, gray = self.pipeline.process(mat)
+            self._encode_streams(mat, colour, gray)
             if self.detection_running:
-                self._perform_motion_detection(mat)
+                self._perform_motion_detection()
             else:
                 self.alarm_threshold_reached = False
-            self._check_for_messages()
-            self._send_heart_beat()
             self.process_times.append(time.perf_counter() - process_start)
 
-    def _perform_motion_detection(self, mat: npt.NDArray[np.uint8]):
-        update_time_ready = (
-            time.perf_counter() - self.last_capture_time > self.process_fps
-        )
-        if update_time_ready and self.detection_running:
-            filtered = self.filter.apply(mat)
-            mat_as_float = np.array(filtered, dtype=np.float32)
+    def _encode_streams(
+        self,
+        mat: np.ndarray,
+        colour: np.ndarray,
+        gray: npt.NDArray[np.uint8],
+    ):
+        """Encode the frame for each stream that needs it
+
+        Streams sharing an encode profile share a single encode.
+
+        Args:
+            mat (np.ndarray): Captured frame.
+            colour (np.ndarray): Captured frame resized to the processing width.
+            gray (npt.NDArray[np.uint8]): Grayscale of the resized frame.
+        """
+        now = time.time()
+        frame_time = self.capture_device.frame_time
+        encoded: Dict[EncodeProfile, bytes] = {}
+        for stream, profile in self.encode_profiles.items():
+            if not self._encode_required(stream, now):
+                continue
+            if profile not in encoded:
+                encoded[profile] = encode_frame(mat, colour, gray, profile)
+            try:
+                self.frame_buffers[stream].write(encoded[profile], frame_time)
+            except FrameBufferError as ex:
+                logger.warning(f"Frame dropped from the {stream} stream: {ex}")
+            self.last_encode_times[stream] = now
+        if encoded:
+            self._notify()
+
+    def _frame_required(self) -> bool:
+        """Checks if the next grabbed frame is needed by detection or any stream
+
+        Frames that aren't needed are never retrieved from the capture device. Called
+        for every grabbed frame, the control messages and the heartbeat are serviced
+        here so they don't wait on the next required frame (only a keyframe every
+        "keyframe_interval_s" while nothing else needs the frames).
+        """
+        self._check_for_messages()
+        self._send_heart_beat()
+        if self.detection_running and self._detection_due():
+            return True
+        now = time.time()
+        return any(self._encode_required(stream, now) for stream in self.frame_buffers)
+
+    def _detection_due(self) -> bool:
+        return time.perf_counter() - self.last_capture_time > self.process_fps
+
+    def _encode_required(self, stream: str, now: float) -> bool:
+        """Checks if the current frame needs to be encoded for the stream
+
+        The live stream is encoded at the stream frame rate while there are live
+        viewers. The recording is encoded at the stream frame rate while an alarm
+        could be close (the pre-alarm recording needs the full frame rate). Otherwise
+        only a keyframe every "keyframe_interval_s" is encoded to keep the snapshot
+        and the recording alive.
+        """
+        since_last_encode = now - self.last_encode_times[stream]
+        if stream == LIVE_STREAM:
+            return self.stream_required and since_last_encode >= self.stream_interval_s
+        if stream == RECORDING_STREAM:
+            if self.detection_running and self.detection_algo.motion_active:
+                return since_last_encode >= self.stream_interval_s
+        return since_last_encode >= self.keyframe_interval_s
+
+    def _perform_motion_detection(self):
+        if self._detection_due() and self.detection_running:
+            detection_frame = self.pipeline.detection_frame(
+                self.detection_algo.input_dtype
+            )
             last_threshold = self.alarm_threshold_reached
-            self.alarm_threshold_reached = self.detection_algo.update(mat_as_float)
+            self.alarm_threshold_reached = self.detection_algo.update(detection_frame)
             if last_threshold != self.alarm_threshold_reached:
                 logger.debug(
                     f"Alarm threshold reached changed to {self.alarm_threshold_reached}"
@@ -98,12 +232,10 @@ class DetectionProcess:
             self.last_capture_time = time.perf_counter()
 
     def _check_for_messages(self):
-        try:
-            msg = self.msg_queue.get_nowait()
+        if msg := self.msg_queue.get_nowait():
             self.detection_running = not msg["stop_processing"]
             self.sensitivity = msg["sensitivity"]
-        except Empty:
-            pass
+            self.stream_required = msg["stream_required"]
 
     def _send_heart_beat(self):  # TODO: Refactor this
         now = time.time()
@@ -113,13 +245,39 @@ class DetectionProcess:
                 running=self.detection_running,
                 motion_detected=self.alarm_threshold_reached,
                 frame_processing_times=copy(self.process_times),
+                frame_read_times=self.capture_device.pop_read_times(),
+                motion_energy=self.detection_algo.motion_energy,
+                queue_stats={
+                    "status": copy(self.status_queue.stats),
+                    **{
+                        stream: copy(frame_buffer.stats)
+                        for stream, frame_buffer in self.frame_buffers.items()
+                    },
+                },
             )
-            self.status_queue.put_nowait(data)
+            self.status_queue.put(data)
+            self._notify()
             self.last_heartbeat = now
             self.process_times.clear()
 
+    def _notify(self):
+        with suppress(BlockingIOError):
+            os.write(self._notify_writer.fileno(), b"\x00")
+
     def start(self):
         self.detection_process.start()
+        os.set_blocking(self._notify_reader.fileno(), False)
+
+    @property
+    def notify_fd(self) -> int:
+        """File descriptor that becomes readable when new data is available"""
+        return self._notify_reader.fileno()
+
+    def clear_notifications(self) -> None:
+        """Drain the pending notifications from the notify file descriptor"""
+        with suppress(BlockingIOError):
+            while os.read(self.notify_fd, 4096):
+                pass
 
     def shutdown(self, timout: float = 5):
         logger.debug("Shutting down detection")
@@ -131,27 +289,134 @@ class DetectionProcess:
         self.detection_process.join(timeout=timout)
         if self.detection_process.is_alive():
             self.detection_process.kill()
+        for frame_buffer in self.frame_buffers.values():
+            frame_buffer.close()
+        self._notify_reader.close()
+        self._notify_writer.close()
         logger.debug("Shutdown complete")
 
     def send_msg(self, msg: CaptureUpdate):
         self.msg_queue.put(msg)
 
-    def get_video_data(self) -> bytes | None:
-        try:
-            return self.raw_video_queue.get_nowait()
-        except Empty:
-            return None
+    def get_video_frames(self, stream: str) -> Tuple[List[VideoFrame], int]:
+        """Drain all unread frames of a stream from its shared frame buffer
+
+        The data is copied once out of shared memory as subscribers hold on to it
+        after the slot is reused.
+
+        Args:
+            stream (str): Stream name (LIVE_STREAM, SNAPSHOT_STREAM, RECORDING_STREAM)
+
+        Returns:
+            Tuple[List[VideoFrame], int]: Unread frames (oldest first) and the number of
+            frames overwritten before they could be read.
+        """
+        frame_buffer = self.frame_buffers[stream]
+        last_frame_seq = self.last_frame_seqs[stream]
+        latest_seq = frame_buffer.latest_seq
+        first_seq = max(last_frame_seq + 1, latest_seq - frame_buffer.slots + 1)
+        dropped = first_seq - (last_frame_seq + 1)
+        frames: List[VideoFrame] = []
+        for seq in range(first_seq, latest_seq + 1):
+            if (frame := frame_buffer.read_frame(seq)) is not None:
+                frames.append(frame)
+            else:
+                dropped += 1
+        self.last_frame_seqs[stream] = latest_seq
+        frame_buffer.mark_read(latest_seq)
+        return frames, dropped
 
     def get_status_data(self) -> DetectionData | None:
-        try:
-            return self.status_queue.get_nowait()
-        except Empty:
-            return None
+        return self.status_queue.get_nowait()
+
+
+def encode_frame(
+    mat: np.ndarray,
+    colour: np.ndarray,
+    gray: npt.NDArray[np.uint8],
+    profile: EncodeProfile,
+) -> bytes:
+    """Encode a frame using an encode profile
+
+    The already resized frames are reused when the profile width matches.
+
+    Args:
+        mat (np.ndarray): Captured frame.
+        colour (np.ndarray): Captured frame resized to the processing width.
+        gray (npt.NDArray[np.uint8]): Grayscale of the resized frame.
+        profile (EncodeProfile): Encode profile.
+
+    Returns:
+        bytes: JPEG encoded frame
+    """
+    if profile.width == colour.shape[1]:
+        img = gray if profile.grayscale else colour
+    else:
+        img = resize_mat(mat, profile.width)
+        if profile.grayscale:
+            img = to_gray_scale(img)
+    return mat_to_bytes(img, quality=profile.quality)
+
+
+def max_encoded_size(profile: EncodeProfile) -> int:
+    """Frame buffer slot size for an encode profile
+
+    Sized to the raw image size of a square frame, shared memory pages are only
+    committed once written so unused slot space costs nothing.
+    """
+    channels = 1 if profile.grayscale else 3
+    return profile.width * profile.width * channels
+
+
+def assign_cores(index: int, count: int, max_cores: int) -> Set[int] | None:
+    """Assign CPU cores to a detection process
+
+    The detection processes are restricted to the first "max_cores" available cores.
+    The cores are split evenly between the processes, if there are more processes than
+    cores they share the cores round robin.
+
+    Args:
+        index (int): Index of the process (camera).
+        count (int): Number of detection processes.
+        max_cores (int): Maximum number of cores, 0 is all available cores.
+
+    Returns:
+        Set[int] | None: Cores of the process, None if the process can't be or
+        doesn't need to be restricted.
+    """
+    if not max_cores or not hasattr(os, "sched_getaffinity"):
+        return None
+    available = sorted(os.sched_getaffinity(0))
+    if max_cores >= len(available) and count == 1:
+        return None
+    allowed = available[:max_cores]
+    if count >= len(allowed):
+        return {allowed[index % len(allowed)]}
+    return {core for i, core in enumerate(allowed) if i % count == index}
+
+
+def init_pipeline(config: AppConfig, camera: CameraOptions) -> FramePipeline:
+    """Create the frame preprocessing pipeline of a camera
+
+    Args:
+        config (AppConfig): Application config.
+        camera (CameraOptions): Camera the frames are from.
+
+    Returns:
+        FramePipeline: Preprocessing pipeline
+    """
+    frame_filter = create_filter(scale_to_detection_width(config.processing))
+    return FramePipeline(
+        frame_filter,
+        regions=camera.regions,
+        detection_width=config.processing.detection_width,
+    )
 
 
-def init_capture_device(config: AppConfig) -> CaptureDevice:
+def init_capture_device(config: AppConfig, camera: CameraOptions) -> CaptureDevice:
+    # The detection loop is done with each frame before the next is captured
     if config.flags.file:
         logger.debug(f"Loading video file from {config.flags.file}")
-        return FileCaptureDevice(config.flags.file)
-    logger.debug(f"Running video file from {config.camera.url}")
-    return CameraCaptureDevice(config.camera.url)
+        return FileCaptureDevice(config.flags.file, reuse_frames=True)
+    logger.debug(f"Running video file from {camera.url}")
+    return CameraCaptureDevice(camera.url, camera.prefetch_frames, reuse_frames=True)
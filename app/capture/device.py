@@ -1,17 +1,44 @@
 from __future__ import annotations
+from collections import deque
+from functools import partial
+import threading
 import time
-from typing import Generator, Protocol
+from typing import Callable, Deque, Generator, Generic, List, Protocol, Tuple, TypeVar
+from loguru import logger
 import cv2 as cv
 import numpy as np
 from app.exceptions import CaptureError
 
+FrameRequired = Callable[[], bool]
+T = TypeVar("T")
+
+# Seconds to wait on the prefetch reader thread to stop, it may be stuck on a read
+READER_JOIN_TIMEOUT_S = 1.0
+
+
+def all_frames() -> bool:
+    return True
+
 
 class CaptureDevice(Protocol):
     """Capture Device Interface"""
 
-    def capture(self) -> Generator[np.ndarray, None, None]:
+    @property
+    def frame_time(self) -> float:
+        """Time the last yielded frame was grabbed from the source"""
+
+    def capture(
+        self, frame_required: FrameRequired = all_frames
+    ) -> Generator[np.ndarray, None, None]:
         """Capture Generator
 
+        Every frame is grabbed from the source but only frames that are required are
+        retrieved (decoded/converted) and yielded.
+
+        Args:
+            frame_required (FrameRequired, optional): Called for each grabbed frame,
+                returns True if the frame should be retrieved. Defaults to all frames.
+
         Raises:
             ConnectionError: On failed connection.
             CaptureError: On frame capture error
@@ -20,61 +47,265 @@ class CaptureDevice(Protocol):
             Generator[np.ndarray, None, None]: An image matrix
         """
 
+    def pop_read_times(self) -> List[float]:
+        """Get and clear the source read times
+
+        The read time is the time spent waiting on the source (grab and retrieve) for
+        each frame, this is the camera side latency as opposed to the processing time.
+
+        Returns:
+            List[float]: Read times in seconds since the last call
+        """
+
 
 class CameraCaptureDevice:
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self, url: str, prefetch_frames: int = 0, reuse_frames: bool = False
+    ) -> None:
         """Standard camera capture device
 
         Args:
             url (str): Url of video resource
+            prefetch_frames (int, optional): If greater than zero the frames are read in
+                a separate thread into a buffer of this many frames (oldest dropped), so
+                network jitter doesn't stall the processing. The thread retrieves every
+                frame, the frames that aren't required are skipped when they are taken
+                from the buffer. Defaults to 0.
+            reuse_frames (bool, optional): Retrieve each frame into the previous frame's
+                array, the yielded frame is only valid until the next frame. Ignored
+                when prefetching. Defaults to False.
         """
         self.url = url
+        self.prefetch_frames = prefetch_frames
+        self.reuse_frames = reuse_frames
         self.cap: cv.VideoCapture | None = None
+        self._frame_time = 0.0
+        self._read_times: List[float] = []
+
+    @property
+    def frame_time(self) -> float:
+        return self._frame_time
 
-    def capture(self) -> Generator[np.ndarray, None, None]:
+    def pop_read_times(self) -> List[float]:
+        read_times, self._read_times = self._read_times, []
+        return read_times
+
+    def capture(
+        self, frame_required: FrameRequired = all_frames
+    ) -> Generator[np.ndarray, None, None]:
+        if self.prefetch_frames > 0:
+            yield from self._prefetch(frame_required)
+            return
         try:
             self.cap = cv.VideoCapture(self.url)
+            frame: np.ndarray | None = None
             while True:
-                if not self.cap.isOpened():
-                    raise ConnectionError(f"Couldn't open camera at {self.url}")
-                ret, mat = self.cap.read()
-                if not ret:
-                    raise CaptureError()
-                yield mat
+                frame_time, read_time, mat = self.read(self.cap, frame_required, frame)
+                self._read_times.append(read_time)
+                if mat is not None:
+                    if self.reuse_frames:
+                        frame = mat
+                    self._frame_time = frame_time
+                    yield mat
         finally:
             if self.cap:
                 self.cap.release()
 
+    def _prefetch(
+        self, frame_required: FrameRequired
+    ) -> Generator[np.ndarray, None, None]:
+        # The reader thread owns its capture and releases it when it exits, a thread
+        # stuck on a stalled stream never touches the capture of the next reader
+        cap = cv.VideoCapture(self.url)
+        reader = PrefetchReader(
+            partial(self.read, cap), self.prefetch_frames, on_exit=cap.release
+        )
+        for frame_time, read_time, mat in reader.frames():
+            self._read_times.append(read_time)
+            if mat is not None and frame_required():
+                self._frame_time = frame_time
+                yield mat
+
+    def read(
+        self,
+        cap: cv.VideoCapture,
+        frame_required: FrameRequired = all_frames,
+        image: np.ndarray | None = None,
+    ) -> Tuple[float, float, np.ndarray | None]:
+        """Grab a frame, retrieving it if required
+
+        Only the given capture is used, so it's safe to call from a reader thread.
+
+        Args:
+            cap (cv.VideoCapture): Capture to read from.
+            frame_required (FrameRequired, optional): Retrieve check.
+            image (np.ndarray | None, optional): Frame to retrieve into, allocated if
+                None or if the frame size differs.
+
+        Raises:
+            ConnectionError: On failed connection.
+            CaptureError: On frame capture error
+
+        Returns:
+            Tuple[float, float, np.ndarray | None]: The grab time, the read time (time
+            spent waiting on the source) and the frame, None if the frame wasn't
+            required.
+        """
+        if not cap.isOpened():
+            raise ConnectionError(f"Couldn't open camera at {self.url}")
+        read_start = time.perf_counter()
+        if not cap.grab():
+            raise CaptureError()
+        frame_time = time.time()
+        mat = None
+        if frame_required():
+            ret, mat = cap.retrieve(image)
+            if not ret:
+                raise CaptureError()
+        return frame_time, time.perf_counter() - read_start, mat
+
+
+class PrefetchReader(Generic[T]):
+    def __init__(
+        self,
+        read: Callable[[], T],
+        max_frames: int,
+        join_timeout_s: float = READER_JOIN_TIMEOUT_S,
+        on_exit: Callable[[], None] | None = None,
+    ) -> None:
+        """Reads frames in a background thread into a bounded buffer
+
+        When the buffer is full the oldest frame is dropped. Errors raised by the
+        reader thread are re-raised by the "frames" generator.
+
+        Closing the generator waits at most "join_timeout_s" for the thread to stop, a
+        thread stuck on a stalled read is left running (it's a daemon thread). The
+        thread only uses what the read function is bound to, "on_exit" is called by
+        the thread as it exits to release it.
+
+        Args:
+            read (Callable[[], T]): Frame read function, only called by the thread.
+            max_frames (int): Buffer size.
+            join_timeout_s (float, optional): Seconds to wait on the thread to stop.
+                Defaults to 1.0.
+            on_exit (Callable[[], None] | None, optional): Called by the thread when it
+                exits.
+        """
+        self._read = read
+        self._on_exit = on_exit
+        self._buffer: Deque[T] = deque(maxlen=max_frames)
+        self._ready = threading.Condition()
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._join_timeout_s = join_timeout_s
+        self._thread = threading.Thread(
+            target=self._run, name="PrefetchReader", daemon=True
+        )
+
+    @property
+    def running(self) -> bool:
+        """The reader thread is running"""
+        return self._thread.is_alive()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                frame = self._read()
+                with self._ready:
+                    self._buffer.append(frame)
+                    self._ready.notify()
+        except BaseException as ex:  # pylint: disable=broad-except
+            with self._ready:
+                self._error = ex
+                self._ready.notify()
+        finally:
+            if self._on_exit:
+                self._on_exit()
+
+    def frames(self) -> Generator[T, None, None]:
+        """Prefetched frames generator
+
+        Raises:
+            Exception: Any exception raised while reading.
+
+        Yields:
+            Generator[T, None, None]: Frames returned by the read function.
+        """
+        self._thread.start()
+        try:
+            while True:
+                with self._ready:
+                    self._ready.wait_for(lambda: self._buffer or self._error)
+                    if self._buffer:
+                        frame = self._buffer.popleft()
+                    else:
+                        raise self._error  # type: ignore
+                yield frame
+        finally:
+            self._stop.set()
+            self._thread.join(self._join_timeout_s)
+            if self._thread.is_alive():
+                logger.warning("The prefetch reader is stuck on a read, not joined")
+
 
 class FileCaptureDevice:
-    def __init__(self, path: str, loop: bool = True, fps: int = 15) -> None:
+    def __init__(
+        self, path: str, loop: bool = True, fps: int = 15, reuse_frames: bool = False
+    ) -> None:
         """Video file capture device
 
         Args:
             path (str): Path to file
             loop (bool, optional): Continous looping of video file. Defaults to True.
             fps (int, optional): Required frame rate. Defaults to 15. -1 is no frame delay
+            reuse_frames (bool, optional): Retrieve each frame into the previous frame's
+                array, the yielded frame is only valid until the next frame. Defaults to
+                False.
         """
         self.path = path
         self.cap: cv.VideoCapture | None = None
         self.loop = loop
+        self.reuse_frames = reuse_frames
         if fps == -1:
             self.frame_wait = 0.0
         else:
             self.frame_wait = 1 / fps
+        self._frame_time = 0.0
+        self._read_times: List[float] = []
 
-    def capture(self) -> Generator[np.ndarray, None, None]:
+    @property
+    def frame_time(self) -> float:
+        return self._frame_time
+
+    def pop_read_times(self) -> List[float]:
+        read_times, self._read_times = self._read_times, []
+        return read_times
+
+    def capture(
+        self, frame_required: FrameRequired = all_frames
+    ) -> Generator[np.ndarray, None, None]:
         try:
             self.cap = cv.VideoCapture(self.path)
+            frame: np.ndarray | None = None
             while True:
                 if not self.cap.isOpened():
                     raise ConnectionError(f"Couldn't open file at {self.path}")
-                ret, mat = self.cap.read()
-                if not ret:
+                read_start = time.perf_counter()
+                if not self.cap.grab():
                     if self.loop:
                         raise CaptureError("End of file")  # TODO: New exception???
                     break
-                yield mat
+                self._frame_time = time.time()
+                if frame_required():
+                    ret, mat = self.cap.retrieve(frame)
+                    if not ret:
+                        raise CaptureError()
+                    if self.reuse_frames:
+                        frame = mat
+                    self._read_times.append(time.perf_counter() - read_start)
+                    yield mat
+                else:
+                    self._read_times.append(time.perf_counter() - read_start)
                 time.sleep(self.frame_wait)
         finally:
             if self.cap:
@@ -1,7 +1,9 @@
+from __future__ import annotations
 from typing import Protocol
 import cv2
 import numpy as np
 import numpy.typing as npt
+from app.datastructures import ProcessingOptions
 
 
 class Filter(Protocol):
@@ -10,11 +12,14 @@ class Filter(Protocol):
     def apply(
         self,
         mat: npt.NDArray[np.uint8],
+        dst: npt.NDArray[np.uint8] | None = None,
     ) -> npt.NDArray[np.uint8]:
         """Apply the filter
 
         Args:
             mat (np.float32): Input image
+            dst (npt.NDArray[np.uint8] | None, optional): Preallocated output image,
+                allocated if None. Must not be the input image.
 
         Returns:
             np.float32: Filtered ouput image
@@ -40,9 +45,14 @@ class GuassianBlurFilter:
     def apply(
         self,
         mat: npt.NDArray[np.uint8],
+        dst: npt.NDArray[np.uint8] | None = None,
     ) -> npt.NDArray[np.uint8]:
         return cv2.GaussianBlur(
-            mat, (self.ksize, self.ksize), sigmaX=self.sigma_x, sigmaY=self.sigma_y
+            mat,
+            (self.ksize, self.ksize),
+            dst=dst,
+            sigmaX=self.sigma_x,
+            sigmaY=self.sigma_y,
         )
 
 
@@ -73,7 +83,22 @@ class BilateralFilter:
     def apply(
         self,
         mat: npt.NDArray[np.uint8],
+        dst: npt.NDArray[np.uint8] | None = None,
     ) -> npt.NDArray[np.uint8]:
         return cv2.bilateralFilter(
-            mat, self.diameter, self.sigma_color, self.sigma_space
+            mat, self.diameter, self.sigma_color, self.sigma_space, dst=dst
         )
+
+
+def create_filter(options: ProcessingOptions) -> Filter:
+    """Create the preprocessing filter selected by the processing options
+
+    Args:
+        options (ProcessingOptions): Processing options, scaled to the detection width.
+
+    Returns:
+        Filter: Preprocessing filter
+    """
+    if options.frame_filter == "bilateral":
+        return BilateralFilter(5, 200, 200)
+    return GuassianBlurFilter(ksize=options.gauss_ksize)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+import struct
+import time
+from typing import Any, Dict
+from app.datastructures import QueuePolicy, QueueStats, VideoFrame
+from app.exceptions import FrameBufferError
+
+__all__ = ["SharedFrameBuffer", "FrameSlot"]
+
+# Buffer header: sequence number of the latest completed write (set by the writer)
+# followed by the sequence number of the last read frame (set by the reader)
+_BUFFER_HEADER = struct.Struct("=QQ")
+_SEQ = struct.Struct("=Q")
+_LATEST_SEQ_OFFSET = 0
+_READ_SEQ_OFFSET = _SEQ.size
+# Slot header: sequence number, capture timestamp, encoded length
+_SLOT_HEADER = struct.Struct("=QdI")
+
+
+@dataclass(frozen=True)
+class FrameSlot:
+    """A frame held in the shared buffer
+
+    Args:
+        seq (int): Frame sequence number (starts at 1).
+        time_stamp (float): Time the frame was written.
+        data (memoryview): Zero copy view of the encoded frame. Only valid until the
+            slot is overwritten, check with "SharedFrameBuffer.is_current".
+    """
+
+    seq: int
+    time_stamp: float
+    data: memoryview
+
+
+class SharedFrameBuffer:
+    def __init__(
+        self,
+        slots: int = 32,
+        slot_size: int = 256 * 1024,
+        policy: QueuePolicy = "drop_oldest",
+        name: str | None = None,
+    ) -> None:
+        """Fixed size frame ring buffer in shared memory
+
+        A single writer (the detection process) writes encoded frames into the slots in
+        order, the reader (main process) reads them without pickling or pipe transfers.
+        The memory used is fixed regardless of how far behind the reader is, when all
+        the slots are unread the policy decides whether the oldest unread frame is
+        overwritten, the new frame is dropped or the writer blocks.
+
+        Args:
+            slots (int, optional): Number of frame slots. Defaults to 32.
+            slot_size (int, optional): Max encoded frame size in bytes. Defaults to 256KiB.
+            policy (QueuePolicy, optional): Full buffer policy. Defaults to "drop_oldest".
+            name (str | None, optional): Shared memory name, generated if None.
+        """
+        self.slots = slots
+        self.slot_size = slot_size
+        self.policy = policy
+        self.stats = QueueStats()
+        self._stride = _SLOT_HEADER.size + slot_size
+        size = _BUFFER_HEADER.size + slots * self._stride
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._owner = True
+        self._buf = self._shm.buf
+        self._write_seq = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "slot_size": self.slot_size,
+            "policy": self.policy,
+            "name": self._shm.name,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Attach to the existing block when unpickled in the child process
+        self.slots = state["slots"]
+        self.slot_size = state["slot_size"]
+        self.policy = state["policy"]
+        self.stats = QueueStats()
+        self._stride = _SLOT_HEADER.size + self.slot_size
+        self._shm = shared_memory.SharedMemory(name=state["name"], create=False)
+        self._owner = False
+        self._buf = self._shm.buf
+        self._write_seq = self.latest_seq
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the latest frame, 0 if nothing has been written"""
+        return _SEQ.unpack_from(self._buf, _LATEST_SEQ_OFFSET)[0]
+
+    @property
+    def read_seq(self) -> int:
+        """Sequence number of the last frame marked as read by the reader"""
+        return _SEQ.unpack_from(self._buf, _READ_SEQ_OFFSET)[0]
+
+    def mark_read(self, seq: int) -> None:
+        """Mark all frames up to and including seq as read
+
+        Args:
+            seq (int): Sequence number.
+        """
+        _SEQ.pack_into(self._buf, _READ_SEQ_OFFSET, seq)
+
+    def _slot_offset(self, seq: int) -> int:
+        return _BUFFER_HEADER.size + (seq % self.slots) * self._stride
+
+    def write(self, data: bytes, time_stamp: float | None = None) -> int | None:
+        """Write a frame into the next slot
+
+        Args:
+            data (bytes): Encoded frame.
+            time_stamp (float | None, optional): Frame time, defaults to now.
+
+        Raises:
+            FrameBufferError: If the frame doesn't fit in a slot.
+
+        Returns:
+            int | None: Sequence number of the written frame, None if it was dropped.
+        """
+        length = len(data)
+        if length > self.slot_size:
+            raise FrameBufferError(
+                f"Frame of {length} bytes exceeds the slot size of {self.slot_size} bytes"
+            )
+        seq = self._write_seq + 1
+        if seq - self.read_seq > self.slots:
+            if self.policy == "block":
+                while seq - self.read_seq > self.slots:
+                    time.sleep(0.001)
+            else:
+                self.stats.drops += 1
+                if self.policy == "drop_newest":
+                    return None
+        self.stats.high_water = max(
+            self.stats.high_water, min(seq - self.read_seq, self.slots)
+        )
+        offset = self._slot_offset(seq)
+        start = offset + _SLOT_HEADER.size
+        # Invalidate the slot while it is written so readers don't see a torn frame
+        _SLOT_HEADER.pack_into(self._buf, offset, 0, 0.0, 0)
+        self._buf[start : start + length] = data
+        _SLOT_HEADER.pack_into(
+            self._buf,
+            offset,
+            seq,
+            time.time() if time_stamp is None else time_stamp,
+            length,
+        )
+        _SEQ.pack_into(self._buf, _LATEST_SEQ_OFFSET, seq)
+        self._write_seq = seq
+        return seq
+
+    def get(self, seq: int) -> FrameSlot | None:
+        """Get a frame by its sequence number
+
+        Args:
+            seq (int): Sequence number.
+
+        Returns:
+            FrameSlot | None: The frame or None if it has been overwritten/not written.
+        """
+        if seq <= 0:
+            return None
+        offset = self._slot_offset(seq)
+        slot_seq, time_stamp, length = _SLOT_HEADER.unpack_from(self._buf, offset)
+        if slot_seq != seq:
+            return None
+        start = offset + _SLOT_HEADER.size
+        return FrameSlot(seq, time_stamp, self._buf[start : start + length])
+
+    def latest(self) -> FrameSlot | None:
+        """Get the latest written frame
+
+        Returns:
+            FrameSlot | None: The latest frame, None if no frames have been written.
+        """
+        return self.get(self.latest_seq)
+
+    def is_current(self, slot: FrameSlot) -> bool:
+        """Check the slot has not been overwritten since it was read
+
+        Args:
+            slot (FrameSlot): Previously read slot.
+
+        Returns:
+            bool: True if the slot data is still valid
+        """
+        offset = self._slot_offset(slot.seq)
+        return _SEQ.unpack_from(self._buf, offset)[0] == slot.seq
+
+    def read_frame(self, seq: int) -> VideoFrame | None:
+        """Copy a frame out of the buffer
+
+        Args:
+            seq (int): Sequence number.
+
+        Returns:
+            VideoFrame | None: The frame, None if it was overwritten during the read.
+        """
+        slot = self.get(seq)
+        if slot is None:
+            return None
+        data = bytes(slot.data)
+        slot.data.release()
+        return VideoFrame(slot.time_stamp, data) if self.is_current(slot) else None
+
+    def close(self) -> None:
+        """Close the buffer, unlinking the shared memory if this is the owner"""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -1,47 +1,76 @@
+from __future__ import annotations
+from typing import Sequence, Tuple
 import cv2 as cv
 import numpy as np
 import numpy.typing as npt
+from app.datastructures import Region
 
 
-def resize_mat(mat: np.ndarray, output_width: int = 640):
+def resized_shape(shape: Tuple[int, ...], output_width: int = 640) -> Tuple[int, ...]:
+    """Shape of an image matrix resized by "resize_mat"
+
+    Args:
+        shape (Tuple[int, ...]): Image matrix shape
+        output_width (int, optional): Desired output width in pixels. Defaults to 640.
+
+    Returns:
+        Tuple[int, ...]: Resized shape, the channels are unchanged
+    """
+    ratio = shape[1] / output_width
+    output_height = int(shape[0] / ratio)
+    return (output_height, output_width, *shape[2:])
+
+
+def resize_mat(
+    mat: np.ndarray, output_width: int = 640, dst: np.ndarray | None = None
+) -> np.ndarray:
     """Resize an image matrix to a specified width
 
     Args:
         mat (np.ndarray): Image matrix
         output_width (int, optional): Desired output width in pixels. Defaults to 640.
+        dst (np.ndarray | None, optional): Preallocated output matrix of the resized
+            shape, allocated if None.
 
     Returns:
-        [type]: [description]
+        np.ndarray: Resized image matrix, the aspect ratio is preserved
     """
-    ratio = mat.shape[1] / output_width
-    output_height = int(mat.shape[0] * ratio)
+    output_height, output_width = resized_shape(mat.shape, output_width)[:2]
     dim = (output_width, output_height)
-    return cv.resize(mat, dim, cv.INTER_AREA)
+    return cv.resize(mat, dim, dst=dst, interpolation=cv.INTER_AREA)
 
 
-def mat_to_bytes(mat: np.ndarray, img_type: str = ".jpg") -> bytes:
+def mat_to_bytes(
+    mat: np.ndarray, img_type: str = ".jpg", quality: int | None = None
+) -> bytes:
     """Convert an image matrix to bytes
 
     Args:
         mat (np.ndarray): Image matrix to convert.
         img_type (str, optional): Required output format. Defaults to ".jpg".
+        quality (int | None, optional): JPEG quality (0-100), OpenCV default if None.
 
     Returns:
         bytes: Image encoded as bytes.
     """
-    return cv.imencode(img_type, mat)[1].tobytes()
+    params = [] if quality is None else [cv.IMWRITE_JPEG_QUALITY, quality]
+    return cv.imencode(img_type, mat, params)[1].tobytes()
 
 
-def to_gray_scale(mat: np.ndarray) -> npt.NDArray[np.uint8]:
+def to_gray_scale(
+    mat: np.ndarray, dst: npt.NDArray[np.uint8] | None = None
+) -> npt.NDArray[np.uint8]:
     """Convert an image matrix to gray scale
 
     Args:
         mat ([np.ndarray): Image matrix to convert
+        dst (npt.NDArray[np.uint8] | None, optional): Preallocated output matrix,
+            allocated if None.
 
     Returns:
         npt.NDArray[np.uint8]: Converted image matrix as gray scale
     """
-    return cv.cvtColor(mat, cv.COLOR_BGR2GRAY)
+    return cv.cvtColor(mat, cv.COLOR_BGR2GRAY, dst=dst)
 
 
 def preprocess_mat(mat: np.ndarray) -> npt.NDArray[np.uint8]:
@@ -55,3 +84,33 @@ def preprocess_mat(mat: np.ndarray) -> npt.NDArray[np.uint8]:
     """
     resized = resize_mat(mat)
     return to_gray_scale(resized)
+
+
+def region_mask(
+    regions: Sequence[Region], shape: Tuple[int, ...]
+) -> npt.NDArray[np.uint8]:
+    """Compile the detection regions into a mask
+
+    Without include regions the whole frame is included, the exclude regions are
+    removed from the included area.
+
+    Args:
+        regions (Sequence[Region]): Detection regions
+        shape (Tuple[int, ...]): Image matrix shape
+
+    Returns:
+        npt.NDArray[np.uint8]: Mask of the frame size, 255 where motion is detected
+    """
+    height, width = shape[:2]
+    scale = np.array([width - 1, height - 1], dtype=np.float64)
+    includes = [region for region in regions if region.mode == "include"]
+    excludes = [region for region in regions if region.mode == "exclude"]
+    mask = np.full((height, width), 0 if includes else 255, dtype=np.uint8)
+    for value, selected in ((255, includes), (0, excludes)):
+        if selected:
+            polygons = [
+                np.round(np.array(region.points) * scale).astype(np.int32)
+                for region in selected
+            ]
+            cv.fillPoly(mask, polygons, value)
+    return mask
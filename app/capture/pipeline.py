@@ -0,0 +1,159 @@
+from __future__ import annotations
+from typing import Sequence, Tuple
+import cv2 as cv
+from loguru import logger
+import numpy as np
+import numpy.typing as npt
+from app.datastructures import Region
+from .filter import Filter
+from .helpers import region_mask, resize_mat, resized_shape, to_gray_scale
+
+__all__ = ["FramePipeline"]
+
+
+class FramePipeline:
+    def __init__(
+        self,
+        frame_filter: Filter,
+        width: int = 640,
+        regions: Sequence[Region] = (),
+        detection_width: int | None = None,
+    ) -> None:
+        """Frame preprocessing pipeline
+
+        Owns a preallocated buffer for every stage (resize, grayscale, filter and float
+        conversion) that the OpenCV "dst" outputs are written to, so processing a frame
+        allocates nothing once the buffers exist. The buffers are reallocated if the
+        captured frame size changes.
+
+        Detection can run on a downscaled copy of the grayscale frame, the streamed
+        frames keep the processing width. The detection frame is cropped to the
+        bounding box of the detection regions, pixels outside the regions are zeroed
+        after filtering so they never change.
+
+        The returned arrays are the pipeline buffers, they are only valid until the
+        next frame is processed.
+
+        Args:
+            frame_filter (Filter): Filter applied before detection.
+            width (int, optional): Width of the processed frames. Defaults to 640.
+            regions (Sequence[Region], optional): Detection regions, the whole frame
+                if empty.
+            detection_width (int | None, optional): Width of the detection frames,
+                None is the processing width.
+        """
+        self.frame_filter = frame_filter
+        self.width = width
+        self.regions = tuple(regions)
+        self.detection_width = detection_width or width
+        self._input_shape: Tuple[int, ...] | None = None
+        self._colour: np.ndarray = np.empty(0, dtype=np.uint8)
+        self._gray: npt.NDArray[np.uint8] = np.empty(0, dtype=np.uint8)
+        self._small: npt.NDArray[np.uint8] = self._gray
+        self._crop: Tuple[slice, slice] = (slice(None), slice(None))
+        self._mask: npt.NDArray[np.uint8] | None = None
+        self._filtered: npt.NDArray[np.uint8] = np.empty(0, dtype=np.uint8)
+        self._detection: np.ndarray = np.empty(0, dtype=np.float32)
+
+    def _allocate(self, shape: Tuple[int, ...]) -> None:
+        colour_shape = resized_shape(shape, self.width)
+        self._colour = np.empty(colour_shape, dtype=np.uint8)
+        self._gray = np.empty(colour_shape[:2], dtype=np.uint8)
+        if self.detection_width == self.width:
+            self._small = self._gray
+        else:
+            self._small = np.empty(
+                resized_shape(self._gray.shape, self.detection_width), dtype=np.uint8
+            )
+        self._crop, self._mask = self._compile_regions(self._small.shape)
+        crop_shape = self._small[self._crop].shape
+        self._filtered = np.empty(crop_shape, dtype=np.uint8)
+        self._detection = np.empty(crop_shape, dtype=self._detection.dtype)
+        self._input_shape = shape
+
+    def _compile_regions(
+        self, shape: Tuple[int, ...]
+    ) -> Tuple[Tuple[slice, slice], npt.NDArray[np.uint8] | None]:
+        """Crop and mask of the detection regions
+
+        Returns:
+            Tuple[Tuple[slice, slice], npt.NDArray[np.uint8] | None]: Crop of the
+            regions bounding box and the cropped mask, None if the crop is all included.
+        """
+        if not self.regions:
+            return (slice(None), slice(None)), None
+        mask = region_mask(self.regions, shape)
+        x, y, width, height = cv.boundingRect(mask)
+        if not width or not height:
+            # Nothing left to detect, a single masked pixel never changes
+            logger.warning("The detection regions exclude the whole frame")
+            x, y, width, height = 0, 0, 1, 1
+        crop = (slice(y, y + height), slice(x, x + width))
+        cropped_mask = mask[crop].copy()
+        if cv.countNonZero(cropped_mask) == cropped_mask.size:
+            return crop, None
+        return crop, cropped_mask
+
+    def prepare(self, shape: Tuple[int, ...]) -> None:
+        """Allocate the buffers for captured frames of a shape, if not already
+
+        Args:
+            shape (Tuple[int, ...]): Captured frame shape.
+        """
+        if shape != self._input_shape:
+            self._allocate(shape)
+
+    def process(self, mat: np.ndarray) -> Tuple[np.ndarray, npt.NDArray[np.uint8]]:
+        """Resize and grayscale a captured frame
+
+        Args:
+            mat (np.ndarray): Captured BGR frame.
+
+        Returns:
+            Tuple[np.ndarray, npt.NDArray[np.uint8]]: The resized colour and grayscale
+            frames.
+        """
+        self.prepare(mat.shape)
+        resize_mat(mat, self.width, dst=self._colour)
+        to_gray_scale(self._colour, dst=self._gray)
+        return self._colour, self._gray
+
+    def detection_gray(self) -> npt.NDArray[np.uint8]:
+        """Grayscale of the last processed frame at the detection width
+
+        Returns:
+            npt.NDArray[np.uint8]: Uncropped and unfiltered detection frame.
+        """
+        if self._small is not self._gray:
+            resize_mat(self._gray, self.detection_width, dst=self._small)
+        return self._small
+
+    def detection_frame(
+        self,
+        dtype: npt.DTypeLike = np.float32,
+        gray: npt.NDArray[np.uint8] | None = None,
+    ) -> np.ndarray:
+        """Filter the detection regions of the last processed grayscale frame and
+        convert it for detection
+
+        Args:
+            dtype (npt.DTypeLike, optional): Detection frame data type, uint8 frames
+                aren't converted. Defaults to float32.
+            gray (npt.NDArray[np.uint8] | None, optional): A "detection_gray" frame
+                (e.g. kept from an earlier frame) to use instead of the last processed
+                frame.
+
+        Returns:
+            np.ndarray: Filtered frame of the detection width, cropped to the
+            detection regions.
+        """
+        source = self.detection_gray() if gray is None else gray
+        self.frame_filter.apply(source[self._crop], dst=self._filtered)
+        if self._mask is not None:
+            cv.bitwise_and(self._filtered, self._mask, dst=self._filtered)
+        if np.dtype(dtype) == self._filtered.dtype:
+            return self._filtered
+        if self._detection.dtype != dtype:
+            self._detection = np.empty(self._filtered.shape, dtype=dtype)
+        np.copyto(self._detection, self._filtered, casting="unsafe")
+        return self._detection
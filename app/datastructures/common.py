@@ -1,8 +1,8 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import time
-from typing import List, Optional, TypedDict, Union
+from typing import Dict, List, Optional, TypedDict, Union
 from uuid import UUID
 from pydantic import BaseModel, Field, validator
 from app.helpers import to_lower_camel
@@ -10,6 +10,8 @@ from .config_data import AppConfig
 
 __all__ = [
     "MetricsData",
+    "QueueStats",
+    "VideoFrame",
     "State",
     "SystemStatus",
     "DetectionData",
@@ -25,9 +27,25 @@ __all__ = [
 ]
 
 
+@dataclass(frozen=True)
+class VideoFrame:
+    time_stamp: float
+    data: bytes
+
+
+class QueueStats(BaseModel):
+    drops: int = 0
+    high_water: int = 0
+
+    class Config:
+        alias_generator = to_lower_camel
+        allow_population_by_field_name = True
+
+
 class MetricsData(BaseModel):
 
     time_stamp: float
+    camera_id: str
     sys_cpu_percent: float
     sys_mem_percent: float
     cap_cpu_percent: float
@@ -36,6 +54,13 @@ class MetricsData(BaseModel):
     loop_avg_s: float
     loop_max_s: float
     loop_min_s: float
+    camera_avg_s: float
+    camera_max_s: float
+    camera_min_s: float
+    frames_dropped: int
+    frames_backlogged: int
+    queue_stats: Dict[str, QueueStats]
+    motion_energy: List[List[float]] = []
 
     class Config:
         alias_generator = to_lower_camel
@@ -46,6 +71,11 @@ class MetricsData(BaseModel):
 class CaptureMetrics:
     pid: int | None
     frame_processing_times: List[float]
+    frames_dropped: int
+    frames_backlogged: int
+    queue_stats: Dict[str, QueueStats] = field(default_factory=dict)
+    frame_read_times: List[float] = field(default_factory=list)
+    motion_energy: List[List[float]] = field(default_factory=list)
 
 
 class State(Enum):
@@ -87,11 +117,15 @@ class DetectionData:
     running: bool
     motion_detected: bool
     frame_processing_times: List[float]
+    queue_stats: Dict[str, QueueStats] = field(default_factory=dict)
+    frame_read_times: List[float] = field(default_factory=list)
+    motion_energy: List[List[float]] = field(default_factory=list)
 
 
 class CaptureUpdate(TypedDict):
     stop_processing: bool
     sensitivity: int
+    stream_required: bool
 
 
 @dataclass(frozen=True)
@@ -99,6 +133,7 @@ class AlertData:
     msg: str
     is_test: bool
     exclusion_list: List[str]
+    camera_id: Optional[str] = None
 
 
 class SystemCommand(Enum):
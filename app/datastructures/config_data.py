@@ -1,9 +1,19 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Literal, Optional, Tuple
 import arrow
 import pydantic
 from app.helpers import to_lower_camel
 
+QueuePolicy = Literal["drop_oldest", "drop_newest", "block"]
+FilterName = Literal["gaussian", "bilateral"]
+RegionMode = Literal["include", "exclude"]
+
+DEFAULT_CAMERA = "default"
+# Frame width the pixel thresholds and the guassian ksize are configured for
+REFERENCE_WIDTH = 640
+# Seconds without a detection process update before the process is restarted
+WATCHDOG_INTERVAL_S = 30.0
+
 
 class Flags(pydantic.BaseModel):
     """Commandline Flags
@@ -23,17 +33,88 @@ class Flags(pydantic.BaseModel):
     file: Optional[str] = pydantic.Field(...)
 
 
+class Region(pydantic.BaseModel, frozen=True):
+    """Detection Region
+
+    Args:
+        points (Tuple[Tuple[float, float], ...]): Polygon vertices (x, y) as fractions
+            of the frame width and height (0.0 - 1.0)
+        mode (RegionMode): "include" detects motion only inside the included regions,
+            "exclude" ignores motion inside the region
+    """
+
+    points: Tuple[Tuple[float, float], ...] = pydantic.Field(...)
+    mode: RegionMode = pydantic.Field("include")
+
+    @pydantic.validator("points")
+    @classmethod
+    def points_must_be_valid(cls, value):
+        if len(value) < 3:
+            raise ValueError("A region needs at least 3 points")
+        if any(not 0.0 <= coord <= 1.0 for point in value for coord in point):
+            raise ValueError("The region points must be between 0.0 and 1.0")
+        return value
+
+
 class CameraOptions(pydantic.BaseModel, frozen=True):
     """Camera Config Options
 
     Args:
-        fps (int): Camera frames per second
-        height (int): Frame image height in pixels
-        width (int): Frame image width in pixels
+        name (str): Camera id, used in the websocket routes and video file names
         url (str): Camera url
+        prefetch_frames (int): Frames buffered by the capture reader thread, 0 reads
+            frames in the detection loop
+        regions (Tuple[Region, ...]): Detection regions, the whole frame if empty
     """
 
+    name: str = pydantic.Field(DEFAULT_CAMERA)
     url: str = pydantic.Field(...)
+    prefetch_frames: int = pydantic.Field(default=0)
+    regions: Tuple[Region, ...] = pydantic.Field(())
+
+    @pydantic.validator("name")
+    @classmethod
+    def name_must_be_valid(cls, value: str):
+        if not value or not value.replace("-", "").replace("_", "").isalnum():
+            raise ValueError(
+                "The camera name must only contain letters, numbers, '-' and '_'"
+            )
+        return value
+
+    @pydantic.validator("prefetch_frames")
+    @classmethod
+    def prefetch_frames_must_be_positive(cls, value):
+        if value < 0:
+            raise ValueError("The value must be zero (disabled) or greater")
+        return value
+
+
+class EncodeProfile(pydantic.BaseModel, frozen=True):
+    """Video Encode Profile
+
+    Args:
+        quality (int): JPEG quality (1-100)
+        width (int): Output width in pixels, the aspect ratio is preserved
+        grayscale (bool): Encode as grayscale, else colour
+    """
+
+    quality: int = pydantic.Field(95)
+    width: int = pydantic.Field(640)
+    grayscale: bool = pydantic.Field(True)
+
+    @pydantic.validator("quality")
+    @classmethod
+    def quality_must_be_valid(cls, value):
+        if value < 1 or value > 100:
+            raise ValueError("The quality must be between 1 and 100")
+        return value
+
+    @pydantic.validator("width")
+    @classmethod
+    def width_must_be_valid(cls, value):
+        if value <= 0:
+            raise ValueError("The width must be greater than zero")
+        return value
 
 
 class ServerOptions(pydantic.BaseModel):
@@ -44,12 +125,47 @@ class ServerOptions(pydantic.BaseModel):
         video_save_dir (str): Directory where captured video is saved
         websocket_port (int): Web socket port
         webserver_port (int): Web server port
+        live_profile (EncodeProfile): Encoding of the live video stream
+        snapshot_profile (EncodeProfile): Encoding of the snapshot image
+        recording_profile (EncodeProfile): Encoding of the saved alert videos
+        pre_roll_budget_mb (int): Maximum size of the recorded video kept for each
+            camera before an alert
+        video_retention_days (int): Days to keep the saved alert videos
+        video_max_size_mb (int): Maximum total size of the saved alert videos, 0 is
+            unlimited
     """
 
     host_name: str = pydantic.Field(...)
     video_save_dir: str = pydantic.Field(...)
     websocket_port: int = pydantic.Field(...)
     webserver_port: int = pydantic.Field(...)
+    live_profile: EncodeProfile = pydantic.Field(default_factory=EncodeProfile)
+    snapshot_profile: EncodeProfile = pydantic.Field(default_factory=EncodeProfile)
+    recording_profile: EncodeProfile = pydantic.Field(default_factory=EncodeProfile)
+    pre_roll_budget_mb: int = pydantic.Field(512)
+    video_retention_days: int = pydantic.Field(7)
+    video_max_size_mb: int = pydantic.Field(0)
+
+    @pydantic.validator("pre_roll_budget_mb")
+    @classmethod
+    def pre_roll_budget_must_be_positive(cls, value):
+        if value <= 0:
+            raise ValueError("The value must be greater than zero")
+        return value
+
+    @pydantic.validator("video_retention_days")
+    @classmethod
+    def video_retention_must_be_positive(cls, value):
+        if value <= 0:
+            raise ValueError("The value must be greater than zero")
+        return value
+
+    @pydantic.validator("video_max_size_mb")
+    @classmethod
+    def video_max_size_must_be_positive(cls, value):
+        if value < 0:
+            raise ValueError("The value must be zero (unlimited) or greater")
+        return value
 
 
 class AlertingOptions(pydantic.BaseModel, frozen=True):
@@ -62,6 +178,7 @@ class AlertingOptions(pydantic.BaseModel, frozen=True):
         min_movement_s (int): Window of time in which movement must occur
         initial_alarm_duration_m (int): Number of minutes for the initial alarm timer to be displayed
         alarm_hysteresis_s (int): Minimum time in seconds for an alarm to be re-raised
+        post_roll_s (int): Seconds of video recorded after an alarm
     """
 
     start_time: str = pydantic.Field(...)
@@ -70,6 +187,14 @@ class AlertingOptions(pydantic.BaseModel, frozen=True):
     min_movement_s: int = pydantic.Field(...)
     initial_alarm_duration_m: int = pydantic.Field(...)
     alarm_hysteresis_s: int = pydantic.Field(...)
+    post_roll_s: int = pydantic.Field(60)
+
+    @pydantic.validator("post_roll_s")
+    @classmethod
+    def post_roll_must_be_positive(cls, value):
+        if value < 0:
+            raise ValueError("The value must be zero (disabled) or greater")
+        return value
 
     @pydantic.validator("start_time", "end_time")
     @classmethod
@@ -104,14 +229,81 @@ class ProcessingOptions(pydantic.BaseModel, frozen=True):
     gauss_ksize: int = pydantic.Field(...)
     pixel_threshold_hi: int = pydantic.Field(...)
     pixel_threshold_lo: int = pydantic.Field(...)
+    queue_size: int = pydantic.Field(32)
+    queue_policy: QueuePolicy = pydantic.Field("drop_oldest")
+    keyframe_interval_s: float = pydantic.Field(1.0)
+    stream_fps: int = pydantic.Field(0)
+    max_cores: int = pydantic.Field(0)
+    algorithm: str = pydantic.Field("basic")
+    motion_processor: str = pydantic.Field("average")
+    frame_filter: FilterName = pydantic.Field("gaussian")
+    detection_width: int = pydantic.Field(REFERENCE_WIDTH)
+    grid_shape: Tuple[int, int] = pydantic.Field((6, 8))
 
-    @pydantic.validator("fps")
+    @pydantic.validator("fps", "queue_size")
     @classmethod
     def validate_camera_data(cls, value):
         if value <= 0:
             raise ValueError("The value must be greater than zero")
         return value
 
+    @pydantic.validator("stream_fps")
+    @classmethod
+    def stream_fps_must_be_positive(cls, value):
+        if value < 0:
+            raise ValueError("The value must be zero (camera rate) or greater")
+        return value
+
+    @pydantic.validator("keyframe_interval_s")
+    @classmethod
+    def keyframe_interval_must_be_valid(cls, value):
+        if not 0 < value < WATCHDOG_INTERVAL_S:
+            raise ValueError(
+                "The value must be greater than zero and less than"
+                f" {WATCHDOG_INTERVAL_S:g}"
+            )
+        return value
+
+    @pydantic.validator("algorithm")
+    @classmethod
+    def algorithm_must_be_registered(cls, value):
+        # Imported here, the detection package imports the config classes
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from app.detection import detection_algorithms
+
+        return _registered(value, detection_algorithms())
+
+    @pydantic.validator("motion_processor")
+    @classmethod
+    def motion_processor_must_be_registered(cls, value):
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from app.detection import motion_processors
+
+        return _registered(value, motion_processors())
+
+    @pydantic.validator("max_cores")
+    @classmethod
+    def max_cores_must_be_positive(cls, value):
+        if value < 0:
+            raise ValueError("The value must be zero (all cores) or greater")
+        return value
+
+    @pydantic.validator("detection_width")
+    @classmethod
+    def detection_width_must_be_valid(cls, value):
+        if not 0 < value <= REFERENCE_WIDTH:
+            raise ValueError(
+                f"The value must be greater than zero and at most {REFERENCE_WIDTH}"
+            )
+        return value
+
+    @pydantic.validator("grid_shape")
+    @classmethod
+    def grid_shape_must_be_positive(cls, value):
+        if min(value) <= 0:
+            raise ValueError("The grid rows and columns must be greater than zero")
+        return value
+
     @pydantic.validator("gauss_ksize")
     @classmethod
     def guass_ksize_must_be_odd(cls, value):
@@ -120,12 +312,18 @@ class ProcessingOptions(pydantic.BaseModel, frozen=True):
         return value
 
 
+def _registered(name: str, registry: Dict[str, Any]) -> str:
+    if name not in registry:
+        raise ValueError(f"The value must be one of {', '.join(sorted(registry))}")
+    return name
+
+
 class AppConfig(pydantic.BaseModel):
     """Application Configuration
 
     Args:
         server (ServerOptions): Server options
-        camera (CameraOptions): Camera options
+        camera (List[CameraOptions]): Camera options, one per camera
         flag (Flags): Command line flags
         processing (ProcessingOptions): Processing options
         alerting (AlertingOptions): Alerting options
@@ -134,13 +332,31 @@ class AppConfig(pydantic.BaseModel):
     """
 
     server: ServerOptions = pydantic.Field(...)
-    camera: CameraOptions = pydantic.Field(...)
+    camera: List[CameraOptions] = pydantic.Field(...)
     flags: Flags = pydantic.Field(...)
     processing: ProcessingOptions = pydantic.Field(...)
     alerting: AlertingOptions = pydantic.Field(...)
     alerters: Optional[Dict[str, Any]]
     monitoring: Optional[Dict[str, Any]]
 
+    @pydantic.validator("camera", pre=True)
+    @classmethod
+    def single_camera_to_list(cls, value):
+        # A single "[camera]" table is the default camera
+        if isinstance(value, (dict, CameraOptions)):
+            return [value]
+        return value
+
+    @pydantic.validator("camera")
+    @classmethod
+    def camera_names_must_be_unique(cls, value: List[CameraOptions]):
+        if not value:
+            raise ValueError("At least one camera is required")
+        names = [camera.name for camera in value]
+        if len(set(names)) != len(names):
+            raise ValueError("The camera names must be unique")
+        return value
+
     class Config:
         alias_generator = to_lower_camel
         allow_population_by_field_name = True
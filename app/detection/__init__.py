@@ -1 +1,4 @@
+from .base import *
+from .registry import *
 from .basic_detection.basic import *
+from .grid_detection.grid import *
@@ -1,40 +1,130 @@
+from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Protocol
+from typing import ClassVar, List, Type
 import numpy as np
-import numpy.typing as npt
-from app.datastructures import ProcessingOptions
+from app.datastructures import REFERENCE_WIDTH, AppConfig, ProcessingOptions
+
+__all__ = ["DetectionAlgorithm", "MotionProcessor", "scale_to_detection_width"]
 
 
 class DetectionAlgorithm(ABC):
     """Abstract detection algorithm
 
-    Basis for all derived detection algorithms.
+    Basis for all derived detection algorithms. Algorithms anywhere in the detection
+    package are registered by "name" and constructed with the application config.
     """
 
+    # Registry name, selected by the "algorithm" processing option
+    name: ClassVar[str] = ""
+    # True if the "motion_processor" processing option is used
+    uses_motion_processor: ClassVar[bool] = False
+
+    def __init__(self, config: AppConfig) -> None:
+        """Create the algorithm
+
+        Args:
+            config (AppConfig): Application configuration.
+        """
+        self.config = config
+
     @abstractmethod
-    def update(self, img: npt.NDArray[np.float32]) -> bool:
+    def update(self, img: np.ndarray) -> bool:
         """Update the algorithm with the latest image frame
 
         Args:
-            img (npt.NDArray[np.float32]): Image array.
+            img (np.ndarray): Grayscale image array of the "input_dtype".
 
         Returns:
             bool: True if detection observed
         """
 
+    @property
+    def input_dtype(self) -> np.dtype:
+        """Data type of the image frames passed to "update"
+
+        Returns:
+            np.dtype: Defaults to float32
+        """
+        return np.dtype(np.float32)
 
-class MotionProcessor(Protocol):
-    """Processor Interface"""
+    @property
+    def motion_active(self) -> bool:
+        """Recent motion check
+
+        Used to decide if an alarm could be close. Defaults to True, override if the
+        algorithm can tell.
+
+        Returns:
+            bool: True if motion has been observed recently
+        """
+        return True
+
+    @property
+    def last_second_motion(self) -> bool | None:
+        """Motion check of the last complete second of updates
+
+        Returns:
+            bool | None: True if the last second had motion, None if the algorithm
+            doesn't judge motion per second.
+        """
+        return None
 
-    def detect_motion(
-        self, img: npt.NDArray[np.float32], options: ProcessingOptions
-    ) -> int:
+    @property
+    def motion_energy(self) -> List[List[float]]:
+        """Motion energy of each grid cell in the last update, for diagnosis
+
+        Returns:
+            List[List[float]]: Rows of cells, the fraction of changed pixels in each
+            cell. Empty if the algorithm doesn't divide the frame.
+        """
+        return []
+
+
+class MotionProcessor(ABC):
+    """Abstract motion processor
+
+    Counts the changed pixels of each frame. Processors anywhere in the detection
+    package are registered by "name" and constructed without arguments.
+    """
+
+    # Registry name, selected by the "motion_processor" processing option
+    name: ClassVar[str] = ""
+    # Data type of the image frames
+    input_dtype: ClassVar[Type[np.number]] = np.float32
+
+    @abstractmethod
+    def detect_motion(self, img: np.ndarray, options: ProcessingOptions) -> int:
         """Process the image frame
 
         Args:
-            img (npt.NDArray[np.float32]): Image array
+            img (np.ndarray): Image array of the "input_dtype"
             options (ProcessingOptions): Processing options
 
         Returns:
             int: Number of changed pixels
         """
+
+
+def scale_to_detection_width(options: ProcessingOptions) -> ProcessingOptions:
+    """Scale the processing options to the detection frame width
+
+    The pixel thresholds and the guassian ksize are configured for frames of the
+    reference width. The thresholds scale with the pixel count (the square of the
+    width ratio) and the ksize with the width, rounded to the nearest odd size.
+
+    Args:
+        options (ProcessingOptions): Processing options
+
+    Returns:
+        ProcessingOptions: Options for frames of the detection width
+    """
+    if options.detection_width == REFERENCE_WIDTH:
+        return options
+    ratio = options.detection_width / REFERENCE_WIDTH
+    return options.copy(
+        update={
+            "pixel_threshold_lo": round(options.pixel_threshold_lo * ratio**2),
+            "pixel_threshold_hi": round(options.pixel_threshold_hi * ratio**2),
+            "gauss_ksize": int(options.gauss_ksize * ratio) // 2 * 2 + 1,
+        }
+    )
@@ -1,39 +1,57 @@
 from __future__ import annotations
-from collections import deque
 from itertools import islice
-from typing import Deque, List, Tuple
+from typing import Deque, Iterator, List, Tuple
 import cv2 as cv
 from loguru import logger
 import numpy as np
 import numpy.typing as npt
 from app.datastructures import AppConfig, ProcessingOptions
-from ..base import DetectionAlgorithm, MotionProcessor
+from ..base import DetectionAlgorithm, MotionProcessor, scale_to_detection_width
+from ..registry import create_motion_processor
 
 
-__all__ = ["BasicDetectionAlgorithm"]
+__all__ = [
+    "BasicDetectionAlgorithm",
+    "MotionHistory",
+    "AverageMotionProcessor",
+    "FixedPointMotionProcessor",
+]
 
 
 class BasicDetectionAlgorithm(DetectionAlgorithm):
-    def __init__(self, config: AppConfig) -> None:
+    name = "basic"
+    uses_motion_processor = True
+
+    def __init__(
+        self, config: AppConfig, motion_processor: MotionProcessor | None = None
+    ) -> None:
         """Basic motion detection algorithm
 
         Args:
             config (AppConfig): Application configuration.
+            motion_processor (MotionProcessor | None, optional): Motion processor, None
+                is the processor selected by the processing options.
         """
-        self.config = config
-        self.motion_processor: MotionProcessor = AverageMotionProcessor()
+        super().__init__(config)
+        self.motion_processor: MotionProcessor = (
+            motion_processor
+            or create_motion_processor(config.processing.motion_processor)
+        )
         self.alerting_options = config.alerting
-        self.processing_options = config.processing
+        # The pixel thresholds apply to frames of the detection width
+        self.processing_options = scale_to_detection_width(config.processing)
         self.detection_list: List[int] = []  # This is the raw pixel change
-        motion_history_length = config.alerting.alert_time_s
-        self.motion_history: Deque[int] = deque(
-            np.zeros(motion_history_length, dtype=int).tolist(),
-            maxlen=motion_history_length,
+        self.motion_history = MotionHistory(
+            config.alerting.alert_time_s, config.alerting.min_movement_s
         )
         self.processeing_fps = config.processing.fps
         self.last_detection_update = False
 
-    def update(self, img: npt.NDArray[np.float32]) -> bool:
+    @property
+    def input_dtype(self) -> np.dtype:
+        return np.dtype(self.motion_processor.input_dtype)
+
+    def update(self, img: np.ndarray) -> bool:
         pixel_change = self.motion_processor.detect_motion(
             img,
             self.processing_options,
@@ -41,12 +59,26 @@ class BasicDetectionAlgorithm(DetectionAlgorithm):
         self.detection_list.append(pixel_change)
         if self._detection_list_full():
             self.last_detection_update = raise_alert(
-                self.detection_list, self.motion_history, self.config
+                self.detection_list, self.motion_history, self.processing_options
             )
             logger.trace(self.detection_list)
             self.detection_list.clear()
         return self.last_detection_update
 
+    @property
+    def last_second_motion(self) -> bool | None:
+        return self.motion_history.latest
+
+    @property
+    def motion_active(self) -> bool:
+        if self.motion_history.motion_count:
+            return True
+        return is_motion(
+            np.array(self.detection_list, dtype=int),
+            self.processing_options.pixel_threshold_lo,
+            self.processing_options.pixel_threshold_hi,
+        )
+
     def _detection_list_full(self) -> bool:
         """Checks if if the curent detection list is full
 
@@ -56,19 +88,96 @@ class BasicDetectionAlgorithm(DetectionAlgorithm):
         return len(self.detection_list) >= full_length
 
 
+class MotionHistory:
+    def __init__(self, length: int, min_move_s: int) -> None:
+        """Fixed length motion history with an O(1) alarm check
+
+        Equivalent to a deque of "length" zeros that each second's motion (1) or no
+        motion (0) is added to with "appendleft" and checked with "is_in_alarm". The
+        values are kept in a NumPy ring buffer, the number of motion seconds and the
+        newest run of "min_move_s" seconds without motion are updated as values are
+        added, so neither the check nor the update scans the history.
+
+        Args:
+            length (int): Number of seconds of history
+            min_move_s (int): Size of the moving window of "is_in_alarm"
+        """
+        self.length = length
+        self.min_move_s = min_move_s
+        self._values = np.zeros(length, dtype=np.int8)
+        self._count = length  # The history starts full of zeros
+        self._motion_count = 0
+        self._no_motion_run = length
+        # Index of the newest second that completes a window without motion
+        self._last_still_window = length - 1 if length >= min_move_s else -1
+
+    @property
+    def motion_count(self) -> int:
+        """Number of seconds with motion in the history"""
+        return self._motion_count
+
+    @property
+    def latest(self) -> bool:
+        """Motion in the newest second"""
+        if not self.length:
+            return False
+        return bool(self._values[(self._count - 1) % self.length])
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[int]:
+        """Newest to oldest, the order of the equivalent deque"""
+        newest = (self._count - 1) % self.length if self.length else 0
+        return iter(np.roll(self._values[::-1], newest + 1).tolist())
+
+    def append(self, motion: bool) -> None:
+        """Add the latest second to the history, dropping the oldest
+
+        Args:
+            motion (bool): True if there was motion
+        """
+        if not self.length:
+            return
+        value = int(motion)
+        slot = self._count % self.length
+        self._motion_count += value - int(self._values[slot])
+        self._values[slot] = value
+        self._no_motion_run = 0 if value else self._no_motion_run + 1
+        if self._no_motion_run >= self.min_move_s:
+            self._last_still_window = self._count
+        self._count += 1
+
+    def in_alarm(self) -> bool:
+        """Same result as "is_in_alarm" on the equivalent deque
+
+        The windows of "is_in_alarm" cover every second except the oldest, so the
+        alarm holds while the newest window without motion starts before them.
+
+        Returns:
+            bool: True if there is movement within every "min_move_s" window
+        """
+        if self.length < self.min_move_s:
+            return True
+        if self.length == self.min_move_s:
+            return self._motion_count > 0
+        newest = self._count - 1
+        oldest_checked = newest - self.length + 2
+        return self._last_still_window - self.min_move_s + 1 < oldest_checked
+
+
 def raise_alert(
-    detected_motion_list: List[int], motion_history: Deque[int], config: AppConfig
+    detected_motion_list: List[int],
+    motion_history: MotionHistory,
+    options: ProcessingOptions,
 ) -> bool:
-    low = config.processing.pixel_threshold_lo
-    high = config.processing.pixel_threshold_hi
-    if is_motion(np.array(detected_motion_list, dtype=int), low, high):
-        motion_history.appendleft(1)
-    else:
-        motion_history.appendleft(0)
-    if is_in_alarm(motion_history, config.alerting.min_movement_s):
-        return True
-    # logger.debug(f"Motion Deque: {motion_history}")
-    return False
+    # The options are scaled to the detection width by the caller
+    low = options.pixel_threshold_lo
+    high = options.pixel_threshold_hi
+    motion_history.append(
+        is_motion(np.array(detected_motion_list, dtype=int), low, high)
+    )
+    return motion_history.in_alarm()
 
 
 def is_motion(
@@ -142,19 +251,29 @@ def bandpass_filter(
     return data
 
 
-class AverageMotionProcessor:
+class AverageMotionProcessor(MotionProcessor):
+    name = "average"
+    input_dtype = np.float32
+
     def __init__(self) -> None:
         """Average motion processing
 
-        Detects the amount of changed pixels between image updates.
+        Detects the amount of changed pixels between image updates. The intermediate
+        frames are kept between updates so no frames are allocated after the first.
         """
         self._average_frame: npt.NDArray[np.float32] | None = None
+        self._delta_frame: npt.NDArray[np.float32] | None = None
+        self._thres_frame: npt.NDArray[np.float32] | None = None
 
     def detect_motion(
         self, img: npt.NDArray[np.float32], options: ProcessingOptions
     ) -> int:
+        if self._delta_frame is None or self._delta_frame.shape != img.shape:
+            self._average_frame = None
+            self._delta_frame = np.empty_like(img)
+            self._thres_frame = np.empty_like(img)
         pixel_change, self._average_frame = detect_pixel_change(
-            img, self._average_frame, options
+            img, self._average_frame, options, self._delta_frame, self._thres_frame
         )
         return pixel_change
 
@@ -163,18 +282,93 @@ def detect_pixel_change(
     img: npt.NDArray[np.float32],
     average_frame: npt.NDArray[np.float32] | None,
     options: ProcessingOptions,
+    delta_frame: npt.NDArray[np.float32] | None = None,
+    thres_frame: npt.NDArray[np.float32] | None = None,
 ) -> Tuple[int, npt.NDArray[np.float32]]:
+    """Count the pixels that changed from the running average frame
+
+    Args:
+        img (npt.NDArray[np.float32]): Image array
+        average_frame (npt.NDArray[np.float32] | None): Running average frame, updated
+            in place. None starts a new average from the image.
+        options (ProcessingOptions): Processing options
+        delta_frame (npt.NDArray[np.float32] | None, optional): Preallocated
+            difference frame, allocated if None.
+        thres_frame (npt.NDArray[np.float32] | None, optional): Preallocated threshold
+            frame, allocated if None.
+
+    Returns:
+        Tuple[int, npt.NDArray[np.float32]]: Changed pixel count and the average frame
+    """
     dilation_iterations = options.dilation_iterations
     avg_weighting = options.avg_weighting
     fixed_lvl_threshold = options.fixed_lvl_threshold
     if average_frame is None:
-        average_frame = img
+        # Copied as the image may be a reused buffer
+        average_frame = img.copy()
     cv.accumulateWeighted(img, average_frame, avg_weighting)
-    delta_frame = cv.absdiff(average_frame, img)
+    delta_frame = cv.absdiff(average_frame, img, dst=delta_frame)
     _, thres_frame = cv.threshold(
-        delta_frame, fixed_lvl_threshold, 255, cv.THRESH_BINARY
+        delta_frame, fixed_lvl_threshold, 255, cv.THRESH_BINARY, dst=thres_frame
     )
     if dilation_iterations:
-        thres_frame = cv.dilate(thres_frame, None, dilation_iterations)
+        cv.dilate(thres_frame, None, dst=thres_frame, iterations=dilation_iterations)
     pixel_count = cv.countNonZero(thres_frame)
     return pixel_count, average_frame
+
+
+class FixedPointMotionProcessor(MotionProcessor):
+    name = "fixed_point"
+    input_dtype = np.uint8
+    # The average is kept in uint16 with 8 fractional bits (8.8 fixed point)
+    FRACTION_BITS = 8
+
+    def __init__(self) -> None:
+        """Fixed point average motion processing
+
+        Same as "AverageMotionProcessor" but works on the uint8 frames and keeps the
+        running average in uint16 fixed point, half the memory traffic of the float32
+        frames (and no float conversion). The changed pixel counts only differ for
+        pixels within 1/256 of the threshold.
+        """
+        self._average_frame: npt.NDArray[np.uint16] | None = None
+        self._scaled_frame: npt.NDArray[np.uint16] = np.empty(0, dtype=np.uint16)
+        self._delta_frame: npt.NDArray[np.uint16] = np.empty(0, dtype=np.uint16)
+        self._thres_frame: npt.NDArray[np.uint8] = np.empty(0, dtype=np.uint8)
+
+    def detect_motion(
+        self, img: npt.NDArray[np.uint8], options: ProcessingOptions
+    ) -> int:
+        if self._average_frame is None or self._average_frame.shape != img.shape:
+            self._scaled_frame = np.empty(img.shape, dtype=np.uint16)
+            self._delta_frame = np.empty_like(self._scaled_frame)
+            self._thres_frame = np.empty(img.shape, dtype=np.uint8)
+            self._average_frame = None
+        np.copyto(self._scaled_frame, img)
+        np.left_shift(self._scaled_frame, self.FRACTION_BITS, out=self._scaled_frame)
+        if self._average_frame is None:
+            self._average_frame = self._scaled_frame.copy()
+        weighting = options.avg_weighting
+        cv.addWeighted(
+            self._average_frame,
+            1.0 - weighting,
+            self._scaled_frame,
+            weighting,
+            0,
+            dst=self._average_frame,
+        )
+        cv.absdiff(self._average_frame, self._scaled_frame, dst=self._delta_frame)
+        cv.compare(
+            self._delta_frame,
+            options.fixed_lvl_threshold << self.FRACTION_BITS,
+            cv.CMP_GT,
+            dst=self._thres_frame,
+        )
+        if options.dilation_iterations:
+            cv.dilate(
+                self._thres_frame,
+                None,
+                dst=self._thres_frame,
+                iterations=options.dilation_iterations,
+            )
+        return cv.countNonZero(self._thres_frame)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+from typing import List
+import cv2 as cv
+import numpy as np
+import numpy.typing as npt
+from app.datastructures import AppConfig, ProcessingOptions
+from ..base import MotionProcessor
+from ..basic_detection.basic import BasicDetectionAlgorithm
+
+
+__all__ = ["GridDetectionAlgorithm", "GridDifferenceProcessor"]
+
+
+class GridDetectionAlgorithm(BasicDetectionAlgorithm):
+    name = "grid"
+    uses_motion_processor = False
+
+    def __init__(self, config: AppConfig) -> None:
+        """Grid frame differencing detection algorithm
+
+        Low CPU alternative to the running average, consecutive detection frames are
+        differenced on the uint8 frames. The changed pixels are counted against the
+        pixel thresholds like the basic algorithm and the motion energy of each grid
+        cell is kept for diagnosis.
+
+        Args:
+            config (AppConfig): Application configuration.
+        """
+        self.grid_processor = GridDifferenceProcessor()
+        super().__init__(config, self.grid_processor)
+
+    @property
+    def input_dtype(self) -> np.dtype:
+        return np.dtype(np.uint8)
+
+    @property
+    def motion_energy(self) -> List[List[float]]:
+        return np.round(self.grid_processor.energy, 3).tolist()
+
+
+class GridDifferenceProcessor(MotionProcessor):
+    input_dtype = np.uint8
+
+    def __init__(self) -> None:
+        """Grid frame differencing motion processing
+
+        Counts the pixels that changed by more than the fixed level threshold since the
+        previous frame, and the fraction of changed pixels in each cell of the
+        "grid_shape" grid. Not registered, the grid algorithm owns it.
+        """
+        self._last_frame: npt.NDArray[np.uint8] | None = None
+        self._delta_frame: npt.NDArray[np.uint8] = np.empty(0, dtype=np.uint8)
+        self._cells: npt.NDArray[np.uint8] = np.zeros((0, 0), dtype=np.uint8)
+
+    @property
+    def energy(self) -> npt.NDArray[np.float32]:
+        """Fraction of changed pixels in each grid cell of the last frame"""
+        return self._cells.astype(np.float32) / 255
+
+    def detect_motion(
+        self, img: npt.NDArray[np.uint8], options: ProcessingOptions
+    ) -> int:
+        rows, columns = options.grid_shape
+        if self._last_frame is None or self._last_frame.shape != img.shape:
+            # Copied as the image may be a reused buffer
+            self._last_frame = img.copy()
+            self._delta_frame = np.empty_like(img)
+            self._cells = np.zeros((rows, columns), dtype=np.uint8)
+            return 0
+        cv.absdiff(img, self._last_frame, dst=self._delta_frame)
+        np.copyto(self._last_frame, img)
+        cv.threshold(
+            self._delta_frame,
+            options.fixed_lvl_threshold,
+            255,
+            cv.THRESH_BINARY,
+            dst=self._delta_frame,
+        )
+        if options.dilation_iterations:
+            cv.dilate(
+                self._delta_frame,
+                None,
+                dst=self._delta_frame,
+                iterations=options.dilation_iterations,
+            )
+        # The area average of the 0/255 pixels is the changed fraction of the cell
+        cv.resize(
+            self._delta_frame,
+            (columns, rows),
+            dst=self._cells,
+            interpolation=cv.INTER_AREA,
+        )
+        return cv.countNonZero(self._delta_frame)
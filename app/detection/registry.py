@@ -0,0 +1,99 @@
+from __future__ import annotations
+from functools import lru_cache
+from importlib import import_module
+from inspect import isabstract, isclass
+from pkgutil import walk_packages
+from typing import Any, Dict, Type, TypeVar
+from app.datastructures import AppConfig
+from app.exceptions import AlgorithmNotFound
+from .base import DetectionAlgorithm, MotionProcessor
+
+__all__ = [
+    "detection_algorithms",
+    "motion_processors",
+    "create_detection_algorithm",
+    "create_motion_processor",
+]
+
+T = TypeVar("T")
+
+
+def discover(base: type, package: str = __package__) -> Dict[str, Any]:
+    """Find the registered implementations of a base class
+
+    Every module of the package is imported, concrete subclasses of the base with a
+    registry name are registered.
+
+    Args:
+        base (type): Base class, with a "name" class attribute
+        package (str, optional): Package to search. Defaults to the detection package.
+
+    Returns:
+        Dict[str, Any]: Implementations (subclasses of the base) by name
+    """
+    registry: Dict[str, Any] = {}
+    package_path = import_module(package).__path__
+    for (_, module_name, _) in walk_packages(package_path, f"{package}."):
+        module = import_module(module_name)
+        for attribute in vars(module).values():
+            if (
+                isclass(attribute)
+                and issubclass(attribute, base)
+                and not isabstract(attribute)
+            ):
+                # The bases declare the name, subclasses without one aren't registered
+                implementation: Any = attribute
+                if implementation.name:
+                    registry[implementation.name] = implementation
+    return registry
+
+
+@lru_cache(maxsize=None)
+def detection_algorithms() -> Dict[str, Type[DetectionAlgorithm]]:
+    """Registered detection algorithms by name"""
+    return discover(DetectionAlgorithm)
+
+
+@lru_cache(maxsize=None)
+def motion_processors() -> Dict[str, Type[MotionProcessor]]:
+    """Registered motion processors by name"""
+    return discover(MotionProcessor)
+
+
+def create_detection_algorithm(config: AppConfig) -> DetectionAlgorithm:
+    """Create the detection algorithm selected by the processing options
+
+    Args:
+        config (AppConfig): Application config.
+
+    Raises:
+        AlgorithmNotFound: If the algorithm isn't registered
+
+    Returns:
+        DetectionAlgorithm: Detection algorithm
+    """
+    return _lookup(detection_algorithms(), config.processing.algorithm)(config)
+
+
+def create_motion_processor(name: str) -> MotionProcessor:
+    """Create a registered motion processor
+
+    Args:
+        name (str): Motion processor name
+
+    Raises:
+        AlgorithmNotFound: If the motion processor isn't registered
+
+    Returns:
+        MotionProcessor: Motion processor
+    """
+    return _lookup(motion_processors(), name)()
+
+
+def _lookup(registry: Dict[str, Type[T]], name: str) -> Type[T]:
+    try:
+        return registry[name]
+    except KeyError as ex:
+        raise AlgorithmNotFound(
+            f"{name} isn't registered, expected one of {', '.join(sorted(registry))}"
+        ) from ex
@@ -1,8 +1,9 @@
 import time
-from typing import Any
+from typing import Any, Optional
 
 
 class Event:
-    def __init__(self, data: Any = None) -> None:
+    def __init__(self, data: Any = None, camera_id: Optional[str] = None) -> None:
         self.created: float = time.time()
         self.data: Any = data
+        self.camera_id = camera_id
@@ -2,7 +2,10 @@ from enum import Enum, auto
 
 
 class Topic(Enum):
-    """Event Topic Class"""
+    """Event Topic Class
+
+    The capture, video and metrics events are keyed by the "camera_id" of the event.
+    """
 
     SYSTEM_TICK = auto()
     SYSTEM_SHUTDOWN = auto()
@@ -13,6 +16,9 @@ class Topic(Enum):
     CAPTURE_METRICS_UPDATE = auto()
     CAPTURE_DETECTION_UPDATE = auto()
     VIDEO_RAW_UPDATE = auto()
+    VIDEO_RECORD_UPDATE = auto()
+    VIDEO_SNAPSHOT_UPDATE = auto()
+    VIDEO_VIEWERS_UPDATE = auto()
     SCHEDULER_CAPTURE_STOP = auto()
     COMMAND_REQUEST = auto()
     COMMAND_PROCESSED = auto()
@@ -23,3 +23,11 @@ class CaptureError(OverwatchException):
 
 class CaptureConnectionError(CaptureError):
     """Video Connection Exception"""
+
+
+class FrameBufferError(OverwatchException):
+    """Shared frame buffer Exception"""
+
+
+class AlgorithmNotFound(OverwatchException):
+    """Exception for an unregistered detection algorithm or motion processor"""
@@ -1,8 +1,8 @@
 from statistics import mean
 from time import time
-from typing import Callable, List
+from typing import Callable, Dict, List, Optional
 import psutil
-from app.datastructures import MetricsData
+from app.datastructures import DEFAULT_CAMERA, MetricsData, QueueStats
 
 
 def calc_or_default(f: Callable[[List[float]], float], values: List[float]) -> float:
@@ -28,6 +28,12 @@ def calc_metrics(
     sys_process: psutil.Process,
     cap_process: psutil.Process,
     cap_loop_times: List[float],
+    frames_dropped: int = 0,
+    frames_backlogged: int = 0,
+    queue_stats: Optional[Dict[str, QueueStats]] = None,
+    cap_read_times: Optional[List[float]] = None,
+    camera_id: str = DEFAULT_CAMERA,
+    motion_energy: Optional[List[List[float]]] = None,
 ) -> MetricsData:
     """Calculate System Metrics
 
@@ -35,12 +41,19 @@ def calc_metrics(
         sys_process (psutil.Process): Main system process object
         cap_process (psutil.Process): Capture process object
         cap_loop_times (List[float]): Image frame loop times
+        frames_dropped (int, optional): Frames overwritten before the main process read them
+        frames_backlogged (int, optional): Frames read in a backlog and not sent to live viewers
+        queue_stats (Optional[Dict[str, QueueStats]]): Detection process queue counters
+        cap_read_times (Optional[List[float]]): Camera frame read times
+        camera_id (str, optional): Camera of the capture process
+        motion_energy (Optional[List[List[float]]]): Motion energy of each grid cell
 
     Returns:
         MetricsData: Computed metrics
     """
     data = MetricsData(
         time_stamp=time(),
+        camera_id=camera_id,
         sys_cpu_percent=sys_process.cpu_percent(),
         sys_mem_percent=sys_process.memory_percent(),
         cap_cpu_percent=cap_process.cpu_percent(),
@@ -48,6 +61,13 @@ def calc_metrics(
         loop_avg_s=get_list_avg(cap_loop_times),
         loop_max_s=get_list_max(cap_loop_times),
         loop_min_s=get_list_min(cap_loop_times),
+        camera_avg_s=get_list_avg(cap_read_times or []),
+        camera_max_s=get_list_max(cap_read_times or []),
+        camera_min_s=get_list_min(cap_read_times or []),
         socket_connections=len(sys_process.connections()),
+        frames_dropped=frames_dropped,
+        frames_backlogged=frames_backlogged,
+        queue_stats=queue_stats or {},
+        motion_energy=motion_energy or [],
     )
     return data
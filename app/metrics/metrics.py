@@ -1,7 +1,7 @@
 from __future__ import annotations
-from loguru import logger
+from typing import Dict
 import psutil
-from app.datastructures import CaptureMetrics
+from app.datastructures import CaptureMetrics, DEFAULT_CAMERA
 from app.events import Event, Publisher, Topic
 from .calc import calc_metrics
 
@@ -13,15 +13,16 @@ class Metrics:
         """System Metrics
 
         Class to handle system metrics.
-        Updated metrics are published to 'Topic.SYSTEM_METRICS_READY'
+        Updated metrics are published to 'Topic.SYSTEM_METRICS_READY' for each camera
 
         Args:
             publisher (Publisher): Application publisher object
         """
         self.publisher = publisher
-        self.sys_process = psutil.Process()
-        self.cap_pid: int | None = None
-        self.cap_process: psutil.Process | None = None
+        # cpu_percent measures from the previous call on the same object, each camera
+        # keeps its own handle to the main process so it spans that camera's interval
+        self.sys_processes: Dict[str, psutil.Process] = {}
+        self.cap_processes: Dict[str, psutil.Process] = {}
 
     def _subscribe(self):
         self.publisher.subscribe(
@@ -30,19 +31,30 @@ class Metrics:
 
     def _capture_metrics_handler(self, event: Event) -> None:
         data: CaptureMetrics = event.data
-        cap_pid_changed = self.cap_pid is None or self.cap_pid != data.pid
-        if cap_pid_changed:  # If the capture process is (re)started we new the new pid
-            self.cap_pid = data.pid
-            self.cap_process = psutil.Process(self.cap_pid)
-        if self.cap_process is not None:
-            metrics = calc_metrics(
-                self.sys_process,
-                self.cap_process,
-                data.frame_processing_times,
-            )
-            self.publisher.send_message(Topic.SYSTEM_METRICS_READY, Event(data=metrics))
-        else:
-            logger.warning("The capture is None")
+        camera_id = event.camera_id or DEFAULT_CAMERA
+        sys_process = self.sys_processes.get(camera_id)
+        if sys_process is None:
+            sys_process = psutil.Process()
+            self.sys_processes[camera_id] = sys_process
+        cap_process = self.cap_processes.get(camera_id)
+        # If the capture process is (re)started we need the new pid
+        if cap_process is None or cap_process.pid != data.pid:
+            cap_process = psutil.Process(data.pid)
+            self.cap_processes[camera_id] = cap_process
+        metrics = calc_metrics(
+            sys_process,
+            cap_process,
+            data.frame_processing_times,
+            data.frames_dropped,
+            data.frames_backlogged,
+            data.queue_stats,
+            data.frame_read_times,
+            camera_id,
+            data.motion_energy,
+        )
+        self.publisher.send_message(
+            Topic.SYSTEM_METRICS_READY, Event(data=metrics, camera_id=camera_id)
+        )
 
     def run(self):
         """Start the metric capture process."""
@@ -0,0 +1,3 @@
+from .avi import *
+from .clip_index import *
+from .segments import *
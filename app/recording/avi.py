@@ -0,0 +1,166 @@
+from __future__ import annotations
+from array import array
+import struct
+from typing import BinaryIO, Tuple
+import cv2 as cv
+import numpy as np
+
+__all__ = ["AviWriter", "jpeg_size"]
+
+# Flag of the main header, the file has an "idx1" index
+AVIF_HASINDEX = 0x10
+# Flag of an index entry, every JPEG frame is a key frame
+AVIIF_KEYFRAME = 0x10
+# Rate denominator of the stream header, frame rates are stored to 1/1000 fps
+RATE_SCALE = 1000
+
+
+class AviWriter:
+    def __init__(
+        self, file_handle: BinaryIO, fps: float, width: int, height: int
+    ) -> None:
+        """Motion JPEG AVI muxer
+
+        The encoded JPEG frames are written straight into the "movi" list of the file,
+        nothing is decoded or encoded. The video has a constant frame rate, "hold"
+        repeats the last frame with an empty (drop frame) chunk so frames can be placed
+        at their time stamps. The headers are written with a zero frame count
+        and rewritten by "close" along with the index, so the file must be seekable.
+
+        Args:
+            file_handle (BinaryIO): File opened for binary writing.
+            fps (float): Frame rate of the video.
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+        """
+        self.file_handle = file_handle
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frames = 0
+        self._max_frame_size = 0
+        # Offset (from the "movi" fourcc) and size of each frame chunk
+        self._index = array("L")
+        self._movi_size = 4
+        self.file_handle.write(self._headers())
+
+    def write(self, frame: bytes) -> None:
+        """Append a JPEG frame
+
+        Args:
+            frame (bytes): Encoded JPEG image of the video dimensions.
+        """
+        size = len(frame)
+        self._index.extend((self._movi_size, size))
+        self.file_handle.write(struct.pack("<4sI", b"00dc", size))
+        self.file_handle.write(frame)
+        if size % 2:
+            self.file_handle.write(b"\0")  # Chunks are word aligned
+        self._movi_size += 8 + size + size % 2
+        self._max_frame_size = max(self._max_frame_size, size)
+        self.frames += 1
+
+    def hold(self) -> None:
+        """Show the last frame for another frame interval"""
+        self.write(b"")
+
+    def close(self) -> None:
+        """Write the index and the final headers, the file handle is left open"""
+        index = bytearray(struct.pack("<4sI", b"idx1", 16 * self.frames))
+        for i in range(self.frames):
+            offset, size = self._index[2 * i], self._index[2 * i + 1]
+            index += struct.pack("<4sIII", b"00dc", AVIIF_KEYFRAME, offset, size)
+        self.file_handle.write(index)
+        self.file_handle.seek(0)
+        self.file_handle.write(self._headers())
+        self.file_handle.seek(0, 2)
+
+    def _headers(self) -> bytes:
+        rate = max(1, round(self.fps * RATE_SCALE))
+        main_header = struct.pack(
+            "<14I",
+            round(1_000_000 * RATE_SCALE / rate),  # Microseconds per frame
+            self._max_frame_size * rate // RATE_SCALE,  # Max bytes per second
+            0,
+            AVIF_HASINDEX,
+            self.frames,
+            0,
+            1,  # Streams
+            self._max_frame_size,
+            self.width,
+            self.height,
+            0,
+            0,
+            0,
+            0,
+        )
+        stream_header = struct.pack(
+            "<4s4sIHHIIIIIIIIhhhh",
+            b"vids",
+            b"MJPG",
+            0,
+            0,
+            0,
+            0,
+            RATE_SCALE,
+            rate,
+            0,
+            self.frames,
+            self._max_frame_size,
+            0xFFFFFFFF,  # Default quality
+            0,
+            0,
+            0,
+            self.width,
+            self.height,
+        )
+        stream_format = struct.pack(
+            "<IiiHH4sIiiII",
+            40,
+            self.width,
+            self.height,
+            1,
+            24,
+            b"MJPG",
+            self.width * self.height * 3,
+            0,
+            0,
+            0,
+            0,
+        )
+        stream_list = _chunk(b"strh", stream_header) + _chunk(b"strf", stream_format)
+        header_list = _chunk(b"avih", main_header) + _list(b"strl", stream_list)
+        headers = _list(b"hdrl", header_list)
+        riff_size = 4 + len(headers) + 8 + self._movi_size + 8 + 16 * self.frames
+        return (
+            struct.pack("<4sI4s", b"RIFF", riff_size, b"AVI ")
+            + headers
+            + struct.pack("<4sI4s", b"LIST", self._movi_size, b"movi")
+        )
+
+
+def _chunk(fourcc: bytes, data: bytes) -> bytes:
+    return struct.pack("<4sI", fourcc, len(data)) + data
+
+
+def _list(list_type: bytes, data: bytes) -> bytes:
+    return struct.pack("<4sI4s", b"LIST", len(data) + 4, list_type) + data
+
+
+def jpeg_size(frame: bytes) -> Tuple[int, int]:
+    """Width and height of a JPEG image
+
+    Args:
+        frame (bytes): Encoded JPEG image.
+
+    Raises:
+        ValueError: If the image can't be decoded
+
+    Returns:
+        Tuple[int, int]: Width and height in pixels
+    """
+    # Only the first frame of a video is decoded, to size the headers
+    mat = cv.imdecode(np.frombuffer(frame, np.uint8), cv.IMREAD_UNCHANGED)
+    if mat is None:
+        raise ValueError("The frame isn't a valid JPEG image")
+    return mat.shape[1], mat.shape[0]
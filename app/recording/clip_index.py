@@ -0,0 +1,150 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+import sqlite3
+import time
+from typing import List, Sequence
+
+__all__ = ["ClipIndex", "purge_clips"]
+
+# Index database in the video save directory, hidden from the clip listings
+INDEX_NAME = ".clips.sqlite3"
+# Seconds to wait on another process (the video writer) holding the database lock
+LOCK_TIMEOUT_S = 30.0
+
+
+class ClipIndex:
+    def __init__(self, directory: str | Path) -> None:
+        """Index of the saved video clips (.avi) of a directory
+
+        Keeps the creation time and size of each clip in an SQLite database in the
+        directory, so expired clips are found with an indexed query instead of listing
+        and stating every file. Clips are added by the video writer, "sync" adds clips
+        saved before the index existed and drops clips deleted by hand.
+
+        Args:
+            directory (str | Path): Video save directory.
+        """
+        self.directory = Path(directory)
+        self._connection = sqlite3.connect(
+            self.directory / INDEX_NAME, timeout=LOCK_TIMEOUT_S
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS clips (filename TEXT PRIMARY KEY,"
+                " created REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS clips_created ON clips (created)"
+            )
+
+    def __enter__(self) -> ClipIndex:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def add(self, filename: str, created: float, size: int) -> None:
+        """Add a clip, replacing a clip of the same name
+
+        Args:
+            filename (str): Clip file name.
+            created (float): Time the clip was saved.
+            size (int): Clip size in bytes.
+        """
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO clips VALUES (?, ?, ?)",
+                (filename, created, size),
+            )
+
+    def remove(self, filenames: Sequence[str]) -> None:
+        """Remove clips from the index, the files aren't deleted
+
+        Args:
+            filenames (Sequence[str]): Clip file names.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM clips WHERE filename = ?",
+                [(filename,) for filename in filenames],
+            )
+
+    def sync(self) -> None:
+        """Match the index to the clips in the directory, lists the directory"""
+        indexed = {
+            filename
+            for (filename,) in self._connection.execute("SELECT filename FROM clips")
+        }
+        saved = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".avi") or not entry.is_file():
+                    continue
+                saved.add(entry.name)
+                if entry.name not in indexed:
+                    stat = entry.stat()
+                    self.add(entry.name, stat.st_mtime, stat.st_size)
+        self.remove(sorted(indexed - saved))
+
+    def expired(self, oldest: float, max_bytes: int = 0) -> List[str]:
+        """Clips older than a time, then the oldest clips over a total size
+
+        Args:
+            oldest (float): Time clips must be saved after.
+            max_bytes (int, optional): Total size of the kept clips, 0 is unlimited.
+
+        Returns:
+            List[str]: Expired clip file names, oldest first.
+        """
+        expired = [
+            filename
+            for (filename,) in self._connection.execute(
+                "SELECT filename FROM clips WHERE created < ? ORDER BY created",
+                (oldest,),
+            )
+        ]
+        if max_bytes:
+            # Newest first, the clips past the cap are the oldest
+            kept = 0
+            over: List[str] = []
+            for filename, size in self._connection.execute(
+                "SELECT filename, size FROM clips WHERE created >= ?"
+                " ORDER BY created DESC",
+                (oldest,),
+            ):
+                kept += size
+                if kept > max_bytes:
+                    over.append(filename)
+            expired.extend(reversed(over))
+        return expired
+
+
+def purge_clips(
+    directory: str | Path, delete_after_days: float, max_bytes: int = 0
+) -> List[str]:
+    """Delete the expired video clips of a directory
+
+    Blocks on file I/O, run it in an executor.
+
+    Args:
+        directory (str | Path): Video save directory.
+        delete_after_days (float): Days to keep the clips.
+        max_bytes (int, optional): Total size of the kept clips, the oldest clips over
+            it are deleted. 0 is unlimited.
+
+    Returns:
+        List[str]: Deleted clip file names.
+    """
+    with ClipIndex(directory) as index:
+        expired = index.expired(time.time() - delete_after_days * 86400, max_bytes)
+        for filename in expired:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except FileNotFoundError:
+                pass
+        index.remove(expired)
+    return expired
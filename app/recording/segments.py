@@ -0,0 +1,220 @@
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+import shutil
+from typing import BinaryIO, Iterator, List, Sequence
+from loguru import logger
+from app.datastructures import VideoFrame
+
+__all__ = ["Segment", "SegmentRing", "read_frames", "remove_segments"]
+
+# Seconds of video in each segment file, the pre-roll is trimmed a segment at a time
+SEGMENT_S = 10.0
+# Weight of each new frame interval in the frame rate moving average
+FRAME_RATE_SMOOTHING = 0.1
+# Segments are also started when the newest is this fraction of the byte budget, so
+# trimming a segment never takes much more than it must
+SEGMENT_BUDGET_FRACTION = 1 / 8
+
+
+@dataclass
+class Segment:
+    """Segment file of consecutive JPEG frames
+
+    The frames are stored back to back in the file, the index of the frames is kept in
+    memory.
+
+    Args:
+        path (Path): Segment file
+        times (array): Time stamp of each frame
+        sizes (array): Size in bytes of each frame
+        size (int): Size in bytes of the segment
+    """
+
+    path: Path
+    times: array = field(default_factory=lambda: array("d"))
+    sizes: array = field(default_factory=lambda: array("L"))
+    size: int = 0
+
+    @property
+    def start_time(self) -> float:
+        return self.times[0]
+
+    @property
+    def end_time(self) -> float:
+        return self.times[-1]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+class SegmentRing:
+    def __init__(
+        self,
+        directory: str | Path,
+        duration_s: float,
+        max_bytes: int,
+        segment_s: float = SEGMENT_S,
+    ) -> None:
+        """On disk ring buffer of the most recent encoded frames
+
+        Frames are appended to the newest segment file, a new segment is started every
+        "segment_s" seconds and the oldest segments are deleted once they are entirely
+        older than "duration_s", so only the frame index is held in memory. Between
+        "duration_s" and "duration_s + segment_s" seconds of frames are kept.
+
+        The oldest segments are also deleted while the segments total more than
+        "max_bytes", busy scenes (large frames) keep less than "duration_s" of frames.
+
+        While "recording" is set frames aren't trimmed by age, only by the byte budget,
+        so the segments cover an alarm from the pre-roll to the end of the post-roll.
+
+        The frame rate is tracked as an exponential moving average of the intervals
+        between the frame time stamps, it follows the camera as the rate drifts or
+        drops to keyframes only.
+
+        Any files left in the directory (e.g. by a crash) are deleted when the first
+        frame is appended.
+
+        Args:
+            directory (str | Path): Segment directory, created if it doesn't exist.
+            duration_s (float): Seconds of frames to keep.
+            max_bytes (int): Byte budget of the segments.
+            segment_s (float, optional): Seconds of frames in each segment. Defaults to
+                10.0.
+        """
+        self.directory = Path(directory)
+        self.duration_s = duration_s
+        self.segment_s = segment_s
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.frame_rate = 0.0
+        self.recording = False
+        self.segments: List[Segment] = []
+        self._last_time_stamp: float | None = None
+        self._interval = 0.0
+        self._over_budget = False
+        self._file: BinaryIO | None = None
+        self._sequence = 0
+
+    @property
+    def frames(self) -> int:
+        """Number of frames in the ring"""
+        return sum(len(segment) for segment in self.segments)
+
+    def append(self, frame: VideoFrame) -> None:
+        """Append a frame to the newest segment
+
+        Args:
+            frame (VideoFrame): Encoded frame.
+        """
+        if (
+            self._file is None
+            or frame.time_stamp - self.segments[-1].start_time >= self.segment_s
+            or self.segments[-1].size >= self.max_bytes * SEGMENT_BUDGET_FRACTION
+        ):
+            self._start_segment()
+        assert self._file is not None
+        self._file.write(frame.data)
+        segment = self.segments[-1]
+        segment.times.append(frame.time_stamp)
+        segment.sizes.append(len(frame.data))
+        segment.size += len(frame.data)
+        self.size += len(frame.data)
+        self._update_frame_rate(frame.time_stamp)
+        if not self.recording:
+            self._trim_age(frame.time_stamp - self.duration_s)
+        self._trim_size()
+
+    def take(self) -> List[Segment]:
+        """Remove all the segments from the ring, the caller owns the segment files
+
+        Returns:
+            List[Segment]: Complete segments, oldest first.
+        """
+        self._close_segment()
+        segments, self.segments = self.segments, []
+        self.size = 0
+        return segments
+
+    def clear(self) -> None:
+        """Delete all the segments"""
+        remove_segments(self.take())
+
+    def _update_frame_rate(self, time_stamp: float) -> None:
+        if self._last_time_stamp is not None and time_stamp > self._last_time_stamp:
+            interval = time_stamp - self._last_time_stamp
+            if self._interval:
+                self._interval += FRAME_RATE_SMOOTHING * (interval - self._interval)
+            else:
+                self._interval = interval
+            self.frame_rate = 1 / self._interval
+        self._last_time_stamp = time_stamp
+
+    def _start_segment(self) -> None:
+        self._close_segment()
+        if self._sequence == 0:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory.mkdir(parents=True)
+        path = self.directory / f"{self._sequence:08d}.mjpeg"
+        self._sequence += 1
+        self._file = open(path, "wb")  # pylint: disable=consider-using-with
+        self.segments.append(Segment(path))
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _trim_age(self, oldest: float) -> None:
+        # The newest segment is never removed, it's open
+        while len(self.segments) > 1 and self.segments[0].end_time < oldest:
+            self._remove_oldest()
+            self._over_budget = False
+
+    def _trim_size(self) -> None:
+        if len(self.segments) > 1 and self.size > self.max_bytes:
+            while len(self.segments) > 1 and self.size > self.max_bytes:
+                self._remove_oldest()
+            if not self._over_budget:
+                kept_s = self.segments[-1].end_time - self.segments[0].start_time
+                logger.warning(
+                    f"Recorded video of {self.directory.name} is over the pre-roll"
+                    f" budget, keeping {kept_s:.0f}s of {self.duration_s:.0f}s"
+                )
+                self._over_budget = True
+
+    def _remove_oldest(self) -> None:
+        segment = self.segments.pop(0)
+        self.size -= segment.size
+        os.remove(segment.path)
+
+
+def read_frames(segments: Sequence[Segment]) -> Iterator[VideoFrame]:
+    """Read the frames of segments
+
+    Args:
+        segments (Sequence[Segment]): Complete segments.
+
+    Yields:
+        Iterator[VideoFrame]: Encoded frames, oldest first.
+    """
+    for segment in segments:
+        with open(segment.path, "rb") as file_handle:
+            for time_stamp, size in zip(segment.times, segment.sizes):
+                yield VideoFrame(time_stamp, file_handle.read(size))
+
+
+def remove_segments(segments: Sequence[Segment]) -> None:
+    """Delete the files of segments
+
+    Args:
+        segments (Sequence[Segment]): Segments to delete.
+    """
+    for segment in segments:
+        try:
+            os.remove(segment.path)
+        except FileNotFoundError:
+            pass
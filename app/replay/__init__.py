@@ -0,0 +1,8 @@
+"""Offline detection replay
+
+Runs the detection preprocessing and algorithm over recorded video files as fast as
+the CPU allows, see "python -m app.replay --help".
+"""
+
+from .frames import *
+from .replay import *
@@ -0,0 +1,81 @@
+import argparse
+from dataclasses import asdict
+import json
+from pathlib import Path
+import sys
+from typing import List
+from app.bootstrap.logger import set_log_level
+from app.config import TomlConfigSerializer, load_config_from_file
+from app.datastructures import Flags
+from app.exceptions import OverwatchException
+from .frames import DEFAULT_CACHE_DIR, FrameCache
+from .replay import replay_files
+
+
+def video_paths(paths: List[str]) -> List[str]:
+    """Expand directories to the video files they contain"""
+    files: List[str] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(str(file) for file in sorted(path.glob("*.avi")))
+        else:
+            files.append(str(path))
+    return files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.replay",
+        description="Run motion detection over recorded videos as fast as possible, "
+        "prints a JSON line per file with the motion of each second and the alarm "
+        "times (seconds into the video)",
+    )
+    parser.add_argument("paths", nargs="+", help="Video files or directories")
+    parser.add_argument(
+        "-c", "--config", default="config.toml", help="Path to config.toml file"
+    )
+    parser.add_argument("--camera", default=None, help="Camera name (regions)")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Processes, defaults to the CPUs"
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=str(DEFAULT_CACHE_DIR),
+        default=None,
+        help="Cache the preprocessed frames, in this directory if given",
+    )
+    parser.add_argument("--log-level", default="warning", help="Application log level")
+    args = parser.parse_args()
+    set_log_level(args.log_level)
+    flags = Flags(
+        config_path=args.config,
+        silent=True,
+        test=True,
+        log_level=args.log_level,
+        file=None,
+    )
+    config = load_config_from_file(flags, TomlConfigSerializer())
+    camera = None
+    if args.camera is not None:
+        cameras = {camera.name: camera for camera in config.camera}
+        if args.camera not in cameras:
+            parser.error(f"Unknown camera {args.camera}")
+        camera = cameras[args.camera]
+    paths = video_paths(args.paths)
+    cache = FrameCache(args.cache) if args.cache else None
+    for result in replay_files(paths, config, camera, args.jobs, cache):
+        print(json.dumps(asdict(result)), flush=True)
+        print(
+            f"{result.path}: {result.duration_s:.0f}s of video in "
+            f"{result.processing_s:.1f}s, {len(result.alarms)} alarms",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except OverwatchException as ex:
+        print(ex, file=sys.stderr)
+        raise SystemExit(2) from ex
@@ -0,0 +1,281 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+import cv2 as cv
+from loguru import logger
+import numpy as np
+import numpy.typing as npt
+from app.capture.detection_process import init_pipeline
+from app.datastructures import AppConfig, CameraOptions
+from app.detection import scale_to_detection_width
+from app.exceptions import CaptureError
+
+__all__ = ["VideoInfo", "CachedFrames", "FrameCache", "sample_frames"]
+
+# Frame rate assumed for files that don't record one
+DEFAULT_VIDEO_FPS = 15.0
+# Bumped when the preprocessing changes, older cache entries are never matched
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "overwatch" / "frames"
+
+
+@dataclass
+class VideoInfo:
+    """Video file information
+
+    Args:
+        frames (int): Number of frames in the file
+        duration_s (float): Video duration
+        shape (Tuple[int, ...]): Frame shape
+    """
+
+    frames: int = 0
+    duration_s: float = 0.0
+    shape: Tuple[int, ...] = ()
+
+
+@dataclass
+class CachedFrames:
+    """Preprocessed frames of a video file
+
+    Args:
+        frames (npt.NDArray[np.uint8]): Read only memory mapped stack of the frames
+        times (List[float]): Video time of each frame
+        info (VideoInfo): Video file information
+    """
+
+    frames: npt.NDArray[np.uint8]
+    times: List[float] = field(default_factory=list)
+    info: VideoInfo = field(default_factory=VideoInfo)
+
+
+def sample_frames(
+    path: str, fps: int | None, info: VideoInfo | None = None
+) -> Iterator[Tuple[float, np.ndarray]]:
+    """Sample the frames of a video file at a frame rate in video time
+
+    The frames between samples are grabbed but never decoded. Frames are timed by
+    their time stamps, held (drop frame) frames aren't counted.
+
+    Args:
+        path (str): Video file
+        fps (int | None): Samples per second of video, None samples every frame
+        info (VideoInfo | None, optional): Updated with the file information.
+
+    Raises:
+        CaptureError: If the file can't be opened or decoded
+
+    Yields:
+        Iterator[Tuple[float, np.ndarray]]: Video time and frame, the frame is reused
+        for the next sample.
+    """
+    info = info or VideoInfo()
+    cap = _open_video(path)
+    frame: np.ndarray | None = None
+    try:
+        for video_time in _grab_samples(cap, fps, info):
+            ret, frame = cap.retrieve(frame)
+            if not ret:
+                raise CaptureError(f"Couldn't decode frame {info.frames} of {path}")
+            info.shape = frame.shape
+            yield video_time, frame
+    finally:
+        cap.release()
+
+
+def _count_samples(path: str, fps: int | None) -> int:
+    """Number of frames "sample_frames" yields, no frame is decoded
+
+    Args:
+        path (str): Video file
+        fps (int | None): Samples per second of video, None samples every frame
+
+    Raises:
+        CaptureError: If the file can't be opened
+
+    Returns:
+        int: Number of samples
+    """
+    cap = _open_video(path)
+    try:
+        return sum(1 for _ in _grab_samples(cap, fps, VideoInfo()))
+    finally:
+        cap.release()
+
+
+def _open_video(path: str) -> cv.VideoCapture:
+    cap = cv.VideoCapture(path)
+    if not cap.isOpened():
+        raise CaptureError(f"Couldn't open file at {path}")
+    return cap
+
+
+def _grab_samples(
+    cap: cv.VideoCapture, fps: int | None, info: VideoInfo
+) -> Iterator[float]:
+    """Grab the frames of a video, yields the video time of each sample
+
+    The sampled frame is the last grabbed frame, it can be retrieved before the next
+    frame is grabbed.
+    """
+    video_fps = cap.get(cv.CAP_PROP_FPS) or DEFAULT_VIDEO_FPS
+    next_sample = 0.0
+    while cap.grab():
+        # The time stamp of the frame, recordings hold frames over gaps
+        video_time = cap.get(cv.CAP_PROP_POS_MSEC) / 1000
+        info.frames += 1
+        info.duration_s = video_time + 1 / video_fps
+        if fps:
+            if video_time < next_sample:
+                continue
+            next_sample += 1 / fps
+        yield video_time
+
+
+class FrameCache:
+    def __init__(self, directory: str | Path = DEFAULT_CACHE_DIR) -> None:
+        """Content addressed cache of preprocessed video frames
+
+        The preprocessed frames of a video are saved as a ".npy" stack named by the
+        hash of the video contents and the preprocessing parameters, and are loaded
+        memory mapped so repeated runs neither decode nor copy them.
+
+        Args:
+            directory (str | Path, optional): Cache directory. Defaults to
+                "~/.cache/overwatch/frames".
+        """
+        self.directory = Path(directory)
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+
+    def load(
+        self,
+        path: str,
+        config: AppConfig,
+        camera: CameraOptions | None = None,
+        every_frame: bool = False,
+        filtered: bool = False,
+    ) -> CachedFrames:
+        """Load the preprocessed frames of a video file, preprocessing it if not cached
+
+        Args:
+            path (str): Video file
+            config (AppConfig): Application config, the processing options
+            camera (CameraOptions | None, optional): Camera the video is from
+                (detection regions). Defaults to the first camera.
+            every_frame (bool, optional): Every frame instead of sampling at the
+                processing frame rate. Defaults to False.
+            filtered (bool, optional): The filtered detection frames (cropped to the
+                detection regions) instead of the resized grayscale frames. Defaults
+                to False.
+
+        Raises:
+            CaptureError: If the file can't be opened or decoded
+
+        Returns:
+            CachedFrames: Preprocessed frames
+        """
+        camera = camera or config.camera[0]
+        key = self._key(path, config, camera, every_frame, filtered)
+        frames_path = self.directory / f"{key}.npy"
+        meta_path = self.directory / f"{key}.json"
+        # The metadata is written last, so the frames are complete if it exists
+        if not meta_path.exists():
+            logger.debug(f"Preprocessing {path} into the frame cache")
+            self._save(path, config, camera, every_frame, filtered, key)
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        return CachedFrames(
+            frames=np.load(frames_path, mmap_mode="r"),
+            times=meta["times"],
+            info=VideoInfo(meta["frames"], meta["duration_s"], tuple(meta["shape"])),
+        )
+
+    def _key(
+        self,
+        path: str,
+        config: AppConfig,
+        camera: CameraOptions,
+        every_frame: bool,
+        filtered: bool,
+    ) -> str:
+        processing = config.processing
+        parameters = {
+            "version": CACHE_VERSION,
+            "video": self._digest(path),
+            "fps": None if every_frame else processing.fps,
+            "detection_width": processing.detection_width,
+        }
+        if filtered:
+            detection_options = scale_to_detection_width(processing)
+            parameters.update(
+                frame_filter=detection_options.frame_filter,
+                gauss_ksize=detection_options.gauss_ksize,
+                regions=[region.dict() for region in camera.regions],
+            )
+        encoded = json.dumps(parameters, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def _digest(self, path: str) -> str:
+        stat = os.stat(path)
+        file_id = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+        if file_id not in self._digests:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file_handle:
+                while chunk := file_handle.read(1 << 20):
+                    digest.update(chunk)
+            self._digests[file_id] = digest.hexdigest()
+        return self._digests[file_id]
+
+    def _save(
+        self,
+        path: str,
+        config: AppConfig,
+        camera: CameraOptions,
+        every_frame: bool,
+        filtered: bool,
+        key: str,
+    ) -> None:
+        pipeline = init_pipeline(config, camera)
+        info = VideoInfo()
+        times: List[float] = []
+        fps = None if every_frame else config.processing.fps
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written to temporary files and renamed, concurrent writers of a key race
+        # harmlessly and readers never see partial files
+        suffix = f".{os.getpid()}.tmp"
+        frames_tmp = self.directory / f"{key}{suffix}.npy"
+        meta_tmp = self.directory / f"{key}{suffix}.json"
+        # The frames are written straight into the memory mapped file, the samples are
+        # counted first (without decoding) to size it
+        count = _count_samples(path, fps)
+        stack: np.memmap | None = None
+        for video_time, frame in sample_frames(path, fps, info):
+            pipeline.process(frame)
+            if filtered:
+                processed = pipeline.detection_frame(np.uint8)
+            else:
+                processed = pipeline.detection_gray()
+            if stack is None:
+                stack = np.lib.format.open_memmap(
+                    frames_tmp, "w+", np.uint8, (count, *processed.shape)
+                )
+            stack[len(times)] = processed
+            times.append(video_time)
+        if stack is None:
+            np.save(frames_tmp, np.empty((0, 0, 0), dtype=np.uint8))
+        else:
+            stack.flush()
+            del stack
+        meta = {
+            "video": path,
+            "frames": info.frames,
+            "duration_s": info.duration_s,
+            "shape": list(info.shape),
+            "times": times,
+        }
+        meta_tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(frames_tmp, self.directory / f"{key}.npy")
+        os.replace(meta_tmp, self.directory / f"{key}.json")
@@ -0,0 +1,168 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import multiprocessing as mp
+import time
+from typing import Iterator, List, Sequence, Tuple
+import cv2 as cv
+import numpy as np
+from app.bootstrap.logger import set_log_level
+from app.capture.detection_process import init_pipeline
+from app.datastructures import AppConfig, CameraOptions
+from app.detection import DetectionAlgorithm, create_detection_algorithm
+from .frames import FrameCache, VideoInfo, sample_frames
+
+__all__ = ["ReplayResult", "replay_file", "replay_files", "worker_pool"]
+
+
+@dataclass
+class ReplayResult:
+    """Detection result of a replayed video file
+
+    Args:
+        path (str): Video file
+        frames (int): Number of frames in the file
+        duration_s (float): Video duration
+        processing_s (float): Time taken to replay the file
+        motion (List[int]): Motion (1) or no motion (0) of each second of video
+        alarms (List[float]): Video time of each raised alarm
+    """
+
+    path: str
+    frames: int = 0
+    duration_s: float = 0.0
+    processing_s: float = 0.0
+    motion: List[int] = field(default_factory=list)
+    alarms: List[float] = field(default_factory=list)
+
+
+def replay_file(
+    path: str,
+    config: AppConfig,
+    camera: CameraOptions | None = None,
+    cache: FrameCache | None = None,
+) -> ReplayResult:
+    """Run detection over a video file
+
+    Frames are sampled at the processing frame rate in video time, the frames between
+    samples are grabbed but never decoded.
+
+    Args:
+        path (str): Video file
+        config (AppConfig): Application config
+        camera (CameraOptions | None, optional): Camera the video is from (detection
+            regions). Defaults to the first camera.
+        cache (FrameCache | None, optional): Cache of the filtered detection frames,
+            None always decodes the file.
+
+    Raises:
+        CaptureError: If the file can't be opened
+
+    Returns:
+        ReplayResult: Detection result
+    """
+    camera = camera or config.camera[0]
+    algorithm = create_detection_algorithm(config)
+    result = ReplayResult(path=path)
+    start = time.perf_counter()
+    info = VideoInfo()
+    if cache is None:
+        frames = detection_frames(path, config, camera, algorithm, info)
+    else:
+        cached = cache.load(path, config, camera, filtered=True)
+        frames = converted_frames(cached.times, cached.frames, algorithm)
+        info = cached.info
+    updates = 0
+    alarm = False
+    for video_time, detection_frame in frames:
+        last_alarm = alarm
+        alarm = algorithm.update(detection_frame)
+        if alarm and not last_alarm:
+            result.alarms.append(round(video_time, 3))
+        updates += 1
+        if updates % config.processing.fps == 0:
+            motion = algorithm.last_second_motion
+            result.motion.append(int(alarm if motion is None else motion))
+    result.frames, result.duration_s = info.frames, info.duration_s
+    result.processing_s = time.perf_counter() - start
+    return result
+
+
+def detection_frames(
+    path: str,
+    config: AppConfig,
+    camera: CameraOptions,
+    algorithm: DetectionAlgorithm,
+    info: VideoInfo,
+) -> Iterator[Tuple[float, np.ndarray]]:
+    pipeline = init_pipeline(config, camera)
+    for video_time, frame in sample_frames(path, config.processing.fps, info):
+        pipeline.process(frame)
+        yield video_time, pipeline.detection_frame(algorithm.input_dtype)
+
+
+def converted_frames(
+    times: Sequence[float], frames: np.ndarray, algorithm: DetectionAlgorithm
+) -> Iterator[Tuple[float, np.ndarray]]:
+    if algorithm.input_dtype == frames.dtype:
+        yield from zip(times, frames)
+        return
+    converted = np.empty(frames.shape[1:], dtype=algorithm.input_dtype)
+    for video_time, frame in zip(times, frames):
+        np.copyto(converted, frame, casting="unsafe")
+        yield video_time, converted
+
+
+def replay_files(
+    paths: Sequence[str],
+    config: AppConfig,
+    camera: CameraOptions | None = None,
+    workers: int | None = None,
+    cache: FrameCache | None = None,
+) -> Iterator[ReplayResult]:
+    """Run detection over video files in parallel, one file per process
+
+    Args:
+        paths (Sequence[str]): Video files
+        config (AppConfig): Application config
+        camera (CameraOptions | None, optional): Camera the videos are from. Defaults
+            to the first camera.
+        workers (int | None, optional): Number of processes. Defaults to the number of
+            CPUs.
+        cache (FrameCache | None, optional): Cache of the filtered detection frames.
+
+    Yields:
+        Iterator[ReplayResult]: Detection result of each file, in order
+    """
+    with worker_pool(workers, config.flags.log_level) as executor:
+        yield from executor.map(
+            replay_file,
+            paths,
+            [config] * len(paths),
+            [camera] * len(paths),
+            [cache] * len(paths),
+        )
+
+
+def worker_pool(workers: int | None, log_level: str) -> ProcessPoolExecutor:
+    """Process pool for spreading video files across the CPUs
+
+    Args:
+        workers (int | None): Number of processes, None is the number of CPUs.
+        log_level (str): Log level of the processes.
+
+    Returns:
+        ProcessPoolExecutor: Process pool
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(log_level,),
+    )
+
+
+def _init_worker(log_level: str) -> None:
+    set_log_level(log_level)
+    # The files are spread across the processes, OpenCV threads would oversubscribe
+    cv.setNumThreads(1)
@@ -4,7 +4,7 @@ from contextlib import suppress
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from functools import partial
 import time
-from typing import cast, Optional
+from typing import cast, Dict, Optional
 from aiohttp import ClientSession, ClientError
 from loguru import logger
 from app.config import save_config_to_file, TomlConfigSerializer
@@ -13,6 +13,7 @@ from app.datastructures import (
     AlertData,
     AppConfig,
     CommandRequest,
+    DEFAULT_CAMERA,
     State,
     SystemCommand,
     SystemStatus,
@@ -59,6 +60,7 @@ class System:  # pylint: disable=too-few-public-methods
             config,
         )
         self.config_file_serializer = TomlConfigSerializer()
+        self.motion_detected: Dict[str, bool] = {}
         self._command_queue: asyncio.Queue[CommandRequest] = asyncio.Queue()
 
     async def run(self):
@@ -84,12 +86,17 @@ class System:  # pylint: disable=too-few-public-methods
 
     def _detection_update_handler(self, event: Event):
         motion_detected: bool = event.data
+        camera_id = event.camera_id or DEFAULT_CAMERA
+        self.motion_detected[camera_id] = motion_detected
         if motion_detected:
+            msg = "Alarm" if camera_id == DEFAULT_CAMERA else f"Alarm ({camera_id})"
             with suppress(ConditionsNotMet):
                 self.state_machine.alarm(
-                    AlertData(msg="Alarm", is_test=False, exclusion_list=[])
+                    AlertData(
+                        msg=msg, is_test=False, exclusion_list=[], camera_id=camera_id
+                    )
                 )
-        else:
+        elif not any(self.motion_detected.values()):
             with suppress(InvalidStartState):  # Reset if in alarm
                 self.state_machine.alarm_reset()
 
@@ -163,12 +170,15 @@ async def run_sub_tasks(
     config: AppConfig, publisher: Publisher, process_pool: ProcessPoolExecutor
 ) -> None:
     alerter = Alerter(config, publisher)
-    video_grabber = VideoGrabber(config, publisher, process_pool)
+    video_grabbers = [
+        VideoGrabber(config, publisher, process_pool, camera)
+        for camera in config.camera
+    ]
     websocket_server = ws.WebSocketServer(config, publisher)
     tasks = [
         run_detection_task(config, publisher),
         alerter.run(),
-        video_grabber.run(),
+        *(video_grabber.run() for video_grabber in video_grabbers),
         websocket_server.start(),
         run_webserver_task(config),
         run_scheduler_task(config, publisher),
@@ -0,0 +1,7 @@
+"""Detection parameter tuning
+
+Sweeps the detection and alerting parameters over labelled video clips, see
+"python -m app.tuning --help".
+"""
+
+from .sweep import *
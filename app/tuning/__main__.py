@@ -0,0 +1,106 @@
+import argparse
+import sys
+from typing import Any, Callable, Dict, List
+from app.bootstrap.logger import set_log_level
+from app.config import TomlConfigSerializer, load_config_from_file
+from app.datastructures import Flags
+from app.exceptions import OverwatchException
+from app.replay.frames import DEFAULT_CACHE_DIR, FrameCache
+from .sweep import SweepResult, load_clips, parameter_sets, sweep
+
+PARAMETER_TYPES: Dict[str, Callable[[str], Any]] = {
+    "gauss_ksize": int,
+    "avg_weighting": float,
+    "fixed_lvl_threshold": int,
+    "pixel_threshold_lo": int,
+    "pixel_threshold_hi": int,
+    "min_movement_s": int,
+}
+
+
+def print_table(results: List[SweepResult]) -> None:
+    names = list(PARAMETER_TYPES)
+    header = names + ["false_pos", "false_neg", "cpu_ms"]
+    rows = [
+        [str(result.parameters[name]) for name in names]
+        + [
+            f"{result.false_positive_rate:.2f}",
+            f"{result.false_negative_rate:.2f}",
+            f"{result.cpu_ms:.3f}",
+        ]
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.tuning",
+        description="Sweep the detection parameters over labelled clips (the *.avi "
+        "files of the 'motion' and 'no_motion' sub-directories) and rank the "
+        "parameter sets by false positive and false negative rates then CPU time. "
+        "Parameters take comma separated values, unset parameters use the config.",
+    )
+    parser.add_argument("clips", help="Labelled clip directory")
+    parser.add_argument(
+        "-c", "--config", default="config.toml", help="Path to config.toml file"
+    )
+    parser.add_argument("--camera", default=None, help="Camera name (regions)")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Processes, defaults to the CPUs"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=None, help="Random search of this many sets"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random search seed")
+    parser.add_argument("--top", type=int, default=20, help="Number of sets shown")
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=str(DEFAULT_CACHE_DIR),
+        default=None,
+        help="Cache the preprocessed frames, in this directory if given",
+    )
+    parser.add_argument("--log-level", default="warning", help="Application log level")
+    for name in PARAMETER_TYPES:
+        parser.add_argument(f"--{name.replace('_', '-')}", default=None)
+    args = parser.parse_args()
+    set_log_level(args.log_level)
+    flags = Flags(
+        config_path=args.config,
+        silent=True,
+        test=True,
+        log_level=args.log_level,
+        file=None,
+    )
+    config = load_config_from_file(flags, TomlConfigSerializer())
+    camera = None
+    if args.camera is not None:
+        cameras = {camera.name: camera for camera in config.camera}
+        if args.camera not in cameras:
+            parser.error(f"Unknown camera {args.camera}")
+        camera = cameras[args.camera]
+    defaults = {**config.processing.dict(), **config.alerting.dict()}
+    space = {
+        name: [convert(value) for value in values.split(",")]
+        if (values := getattr(args, name)) is not None
+        else [defaults[name]]
+        for name, convert in PARAMETER_TYPES.items()
+    }
+    clips = load_clips(args.clips)
+    if not clips:
+        parser.error(f"No clips in {args.clips}/motion or {args.clips}/no_motion")
+    sets = parameter_sets(space, args.samples, args.seed)
+    print(f"{len(sets)} parameter sets over {len(clips)} clips", file=sys.stderr)
+    cache = FrameCache(args.cache) if args.cache else None
+    print_table(sweep(clips, config, sets, camera, args.jobs, cache)[: args.top])
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except OverwatchException as ex:
+        print(ex, file=sys.stderr)
+        raise SystemExit(2) from ex
@@ -0,0 +1,296 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from itertools import groupby, product
+from pathlib import Path
+import random
+from tempfile import TemporaryDirectory
+import time
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+import numpy as np
+from app.capture.detection_process import init_pipeline
+from app.capture.filter import create_filter
+from app.datastructures import AppConfig, CameraOptions
+from app.detection import create_motion_processor, scale_to_detection_width
+from app.detection.basic_detection.basic import MotionHistory, is_motion
+from app.replay import FrameCache, worker_pool
+
+__all__ = [
+    "DETECTION_PARAMETERS",
+    "ALARM_PARAMETERS",
+    "Clip",
+    "ClipCounts",
+    "SweepResult",
+    "load_clips",
+    "parameter_sets",
+    "count_clip",
+    "raises_alarm",
+    "sweep",
+]
+
+# Parameters that change the changed pixel counts, each combination is processed
+DETECTION_PARAMETERS = ("gauss_ksize", "avg_weighting", "fixed_lvl_threshold")
+# Parameters only applied to the changed pixel counts
+ALARM_PARAMETERS = ("pixel_threshold_lo", "pixel_threshold_hi", "min_movement_s")
+
+ParameterSet = Dict[str, Any]
+DetectionKey = Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Clip:
+    """Labelled video clip
+
+    Args:
+        path (str): Video file
+        motion (bool): True if the clip should raise an alarm
+    """
+
+    path: str
+    motion: bool
+
+
+@dataclass
+class ClipCounts:
+    """Changed pixel counts of a clip for each set of detection parameters
+
+    Args:
+        clip (Clip): Clip
+        counts (Dict[DetectionKey, List[int]]): Changed pixels of each sampled frame
+            by the "DETECTION_PARAMETERS" values
+        cpu_s (Dict[DetectionKey, float]): CPU time per frame of the filter and the
+            motion processor by the "DETECTION_PARAMETERS" values
+    """
+
+    clip: Clip
+    counts: Dict[DetectionKey, List[int]] = field(default_factory=dict)
+    cpu_s: Dict[DetectionKey, float] = field(default_factory=dict)
+
+
+@dataclass
+class SweepResult:
+    """Detection outcome of a parameter set over all the clips
+
+    Args:
+        parameters (ParameterSet): Parameter values
+        false_positive_rate (float): Fraction of the no motion clips raising an alarm
+        false_negative_rate (float): Fraction of the motion clips without an alarm
+        cpu_ms (float): CPU time per frame of the filter and the motion processor,
+            the decoding and resizing are the same for every set
+    """
+
+    parameters: ParameterSet
+    false_positive_rate: float
+    false_negative_rate: float
+    cpu_ms: float
+
+
+def load_clips(directory: str) -> List[Clip]:
+    """Load the clips of the "motion" and "no_motion" sub-directories
+
+    Args:
+        directory (str): Clip directory
+
+    Returns:
+        List[Clip]: Labelled clips
+    """
+    clips = []
+    for label, motion in (("motion", True), ("no_motion", False)):
+        for path in sorted((Path(directory) / label).glob("*.avi")):
+            clips.append(Clip(str(path), motion))
+    return clips
+
+
+def parameter_sets(
+    space: Mapping[str, Sequence[Any]], samples: int | None = None, seed: int = 0
+) -> List[ParameterSet]:
+    """Combinations of the parameter values
+
+    Args:
+        space (Mapping[str, Sequence[Any]]): Values of each parameter
+        samples (int | None, optional): Number of random combinations, None is every
+            combination (grid search).
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        List[ParameterSet]: Parameter sets
+    """
+    sets = [dict(zip(space, values)) for values in product(*space.values())]
+    if samples is not None and samples < len(sets):
+        sets = random.Random(seed).sample(sets, samples)
+    return sets
+
+
+def detection_key(parameters: ParameterSet) -> DetectionKey:
+    return tuple(parameters[name] for name in DETECTION_PARAMETERS)
+
+
+def count_clip(
+    clip: Clip,
+    config: AppConfig,
+    detection_keys: Sequence[DetectionKey],
+    camera: CameraOptions | None = None,
+    cache: FrameCache | None = None,
+) -> ClipCounts:
+    """Count the changed pixels of a clip's frames for each set of detection parameters
+
+    The clip is decoded and preprocessed once, each guassian ksize filters the frames
+    once and its motion processors share the filtered frame.
+
+    Args:
+        clip (Clip): Clip
+        config (AppConfig): Application config, the other parameters
+        detection_keys (Sequence[DetectionKey]): "DETECTION_PARAMETERS" values
+        camera (CameraOptions | None, optional): Camera the clip is from. Defaults to
+            the first camera.
+        cache (FrameCache | None, optional): Cache of the preprocessed frames, None
+            always decodes the clip (into a temporary cache, so the frames are memory
+            mapped rather than held in memory).
+
+    Returns:
+        ClipCounts: Changed pixel counts
+    """
+    if cache is None:
+        with TemporaryDirectory() as directory:
+            return count_clip(
+                clip, config, detection_keys, camera, FrameCache(directory)
+            )
+    camera = camera or config.camera[0]
+    pipeline = init_pipeline(config, camera)
+    result = ClipCounts(clip)
+    cached = cache.load(clip.path, config, camera)
+    pipeline.prepare(cached.info.shape)
+    frames = cached.frames
+    sample_count = max(len(frames), 1)
+    for _, group in groupby(sorted(set(detection_keys)), key=lambda key: key[0]):
+        keys = list(group)
+        options = {
+            key: scale_to_detection_width(
+                config.processing.copy(update=dict(zip(DETECTION_PARAMETERS, key)))
+            )
+            for key in keys
+        }
+        processors = {
+            key: create_motion_processor(config.processing.motion_processor)
+            for key in keys
+        }
+        pipeline.frame_filter = create_filter(options[keys[0]])
+        dtype = processors[keys[0]].input_dtype
+        filter_s = 0.0
+        processor_s = dict.fromkeys(keys, 0.0)
+        for key in keys:
+            result.counts[key] = []
+        for gray in frames:
+            start = time.process_time()
+            detection_frame = pipeline.detection_frame(dtype, gray)
+            filter_s += time.process_time() - start
+            for key in keys:
+                start = time.process_time()
+                count = processors[key].detect_motion(detection_frame, options[key])
+                processor_s[key] += time.process_time() - start
+                result.counts[key].append(count)
+        for key in keys:
+            result.cpu_s[key] = (filter_s + processor_s[key]) / sample_count
+    return result
+
+
+def raises_alarm(
+    counts: Sequence[int], config: AppConfig, parameters: ParameterSet
+) -> bool:
+    """Check if the changed pixel counts raise an alarm
+
+    The same check as the basic detection algorithm, a second of counts at a time.
+
+    Args:
+        counts (Sequence[int]): Changed pixels of each frame
+        config (AppConfig): Application config, the other parameters
+        parameters (ParameterSet): Parameter values
+
+    Returns:
+        bool: True if an alarm is raised
+    """
+    options = scale_to_detection_width(
+        config.processing.copy(
+            update={
+                name: parameters[name]
+                for name in ("pixel_threshold_lo", "pixel_threshold_hi")
+            }
+        )
+    )
+    history = MotionHistory(config.alerting.alert_time_s, parameters["min_movement_s"])
+    fps = options.fps
+    for start in range(0, len(counts) - fps + 1, fps):
+        second = np.array(counts[start : start + fps], dtype=int)
+        history.append(
+            is_motion(second, options.pixel_threshold_lo, options.pixel_threshold_hi)
+        )
+        if history.in_alarm():
+            return True
+    return False
+
+
+def sweep(
+    clips: Sequence[Clip],
+    config: AppConfig,
+    sets: Sequence[ParameterSet],
+    camera: CameraOptions | None = None,
+    workers: int | None = None,
+    cache: FrameCache | None = None,
+) -> List[SweepResult]:
+    """Evaluate parameter sets over labelled clips
+
+    Each clip is counted in its own process for every combination of the detection
+    parameters, the alarm parameters are then applied to the counts.
+
+    Args:
+        clips (Sequence[Clip]): Labelled clips
+        config (AppConfig): Application config, the other parameters
+        sets (Sequence[ParameterSet]): Parameter sets, with every "DETECTION_PARAMETERS"
+            and "ALARM_PARAMETERS" value
+        camera (CameraOptions | None, optional): Camera the clips are from. Defaults to
+            the first camera.
+        workers (int | None, optional): Number of processes. Defaults to the number of
+            CPUs.
+        cache (FrameCache | None, optional): Cache of the preprocessed frames.
+
+    Returns:
+        List[SweepResult]: Results, fewest errors first then the lowest CPU time
+    """
+    keys = sorted({detection_key(parameters) for parameters in sets})
+    with worker_pool(workers, config.flags.log_level) as executor:
+        clip_counts = list(
+            executor.map(
+                count_clip,
+                clips,
+                [config] * len(clips),
+                [keys] * len(clips),
+                [camera] * len(clips),
+                [cache] * len(clips),
+            )
+        )
+    motion_clips = sum(clip.motion for clip in clips)
+    still_clips = len(clips) - motion_clips
+    results = []
+    for parameters in sets:
+        key = detection_key(parameters)
+        false_positives = false_negatives = 0
+        cpu_s = 0.0
+        for counts in clip_counts:
+            alarm = raises_alarm(counts.counts[key], config, parameters)
+            false_positives += alarm and not counts.clip.motion
+            false_negatives += not alarm and counts.clip.motion
+            cpu_s += counts.cpu_s[key]
+        results.append(
+            SweepResult(
+                parameters=parameters,
+                false_positive_rate=false_positives / max(still_clips, 1),
+                false_negative_rate=false_negatives / max(motion_clips, 1),
+                cpu_ms=cpu_s / max(len(clip_counts), 1) * 1000,
+            )
+        )
+    results.sort(
+        key=lambda result: (
+            result.false_positive_rate + result.false_negative_rate,
+            result.cpu_ms,
+        )
+    )
+    return results
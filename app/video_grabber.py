@@ -1,46 +1,68 @@
 from __future__ import annotations
 import asyncio
-from collections import deque
 from concurrent.futures import Executor
 from datetime import datetime
 import os
+import sqlite3
 import time
-from typing import Awaitable, Deque, List
-import cv2 as cv
+from typing import Awaitable, Iterable, List
 from loguru import logger
-import numpy as np
-from app.datastructures import AlertData, AppConfig
+from app.datastructures import AlertData, AppConfig, CameraOptions, VideoFrame
 from app.events import Event, Publisher, Topic
 from app.exceptions import OverwatchException
+from app.recording import (
+    AviWriter,
+    ClipIndex,
+    Segment,
+    SegmentRing,
+    jpeg_size,
+    purge_clips,
+    read_frames,
+    remove_segments,
+)
 
 __all__ = ["VideoGrabber"]
 
+# Hours between the purges of the saved video files
+PURGE_INTERVAL_HRS = 1.0
 
-def file_purge_task(directory: str, interval_hrs: int, delete_after_days: int = 7):
+
+async def file_purge_task(
+    directory: str, interval_hrs: float, delete_after_days: int = 7, max_bytes: int = 0
+):
     """Video file purge task.
 
-    Deletes old video files (.avi) in the specified directory.
+    Deletes old video files (.avi) in the specified directory, and the oldest files
+    while the files total more than "max_bytes". The files are found through the
+    clip index and deleted in an executor, so the event loop is never blocked on the
+    file system. The index is synced with the directory once on start up.
 
     Args:
         directory (str): Video file directory.
-        interval_hrs (int): Hours between the purge checks
+        interval_hrs (float): Hours between the purge checks
         delete_after_days (int, optional): Days to keep the video files. Defaults to 7.
+        max_bytes (int, optional): Total size of the video files, 0 is unlimited.
+            Defaults to 0.
     """
-    logger.debug("Beginning purge of video files")
-    for filename in os.listdir(directory):
-        if not filename.endswith(".avi"):
-            continue
-        else:
-            full_path = directory + "/" + filename
-            created = os.path.getmtime(full_path)
-            if created + (delete_after_days * 60 * 60 * 24) < time.time():
-                os.remove(full_path)
-                logger.debug(f"Removed video file {full_path}")
-
     loop = asyncio.get_event_loop()
-    next_call = loop.time() + (interval_hrs * 3600)
-    loop.call_at(next_call, file_purge_task, directory, interval_hrs)
-    logger.debug(f"Running next video file purge in {interval_hrs}hrs ")
+    await loop.run_in_executor(None, sync_clip_index, directory)
+    while True:
+        logger.debug("Beginning purge of video files")
+        try:
+            removed = await loop.run_in_executor(
+                None, purge_clips, directory, delete_after_days, max_bytes
+            )
+            for filename in removed:
+                logger.debug(f"Removed video file {directory}/{filename}")
+        except (OSError, sqlite3.Error) as ex:
+            logger.error(f"Video file purge failed, {ex}")
+        logger.debug(f"Running next video file purge in {interval_hrs}hrs ")
+        await asyncio.sleep(interval_hrs * 3600)
+
+
+def sync_clip_index(directory: str) -> None:
+    with ClipIndex(directory) as index:
+        index.sync()
 
 
 class VideoGrabber:
@@ -49,13 +71,20 @@ class VideoGrabber:
         config: AppConfig,
         publisher: Publisher,
         executor: Executor,
+        camera: CameraOptions,
     ):
         """Video Grabber Class
 
-        Saves the video footage prior to the alert being raised
+        Saves the video footage of a camera around the alert being raised
 
-        The duration of the video is equal to the "alerting.alert_time_s" value in the
-        configuration.
+        The recorded frames are appended to a ring of short segment files in the
+        ".segments" directory of the save directory, so the pre-roll isn't held in
+        memory. On an alarm the ring stops trimming and keeps recording for
+        "alerting.post_roll_s" seconds, alarms during the post-roll extend it. Then the
+        segments are handed over to be written into a single video file.
+
+        The duration of the video is at least 1.5 times the "alerting.alert_time_s"
+        value in the configuration.
 
         The write interval_hrs is limited by the "alerting.alert_time_s" value in the
         configuration.
@@ -64,121 +93,185 @@ class VideoGrabber:
             config (AppConfig): Application config
             publisher (Publisher): Pulisher
             executor (Executor): Pool Executor
+            camera (CameraOptions): Camera to record
         """
         self.config = config
         self.publisher = publisher
         self.executor = executor
+        self.camera_id = camera.name
+        # The camera name tells the files apart when there is more than one camera
+        self.file_prefix = f"{camera.name}_" if len(config.camera) > 1 else ""
+        # The save directory is shared, so only the first camera purges it
+        self.purge_files = camera.name == config.camera[0].name
+        self.purge_task: asyncio.Future | None = None
         self.save_path = config.server.video_save_dir
-        self.video_deque: Deque[bytes] = deque()
         self.pending_writes: List[Awaitable[str]] = []
-        self.frame_rate: int = 0
         self.last_write = -9999.9
+        self.post_roll_s = config.alerting.post_roll_s
+        # End of the post-roll of the alarm being recorded, None if not recording
+        self.recording_until: float | None = None
         self.min_write_interval_s = (
             config.alerting.alert_time_s * 1.5
         )  # Add a 50% buffer for future tuning
+        self.ring = SegmentRing(
+            os.path.join(self.save_path, ".segments", camera.name),
+            self.min_write_interval_s,
+            config.server.pre_roll_budget_mb * 1024 * 1024,
+        )
 
     def _subscribe(self):
-        self.publisher.subscribe(Topic.VIDEO_RAW_UPDATE, self._raw_video_update_handler)
+        self.publisher.subscribe(
+            Topic.VIDEO_RECORD_UPDATE, self._record_video_update_handler
+        )
         self.publisher.subscribe(Topic.SYSTEM_ALARM, self._alarm_raised_handler)
 
-    def _raw_video_update_handler(self, evt: Event):
-        self.video_deque.append(evt.data)
+    def _record_video_update_handler(self, evt: Event):
+        if evt.camera_id != self.camera_id:
+            return
+        frames: List[VideoFrame] = evt.data
+        for frame in frames:
+            self.ring.append(frame)
+        self._finish_recording(frames[-1].time_stamp)
 
     def _alarm_raised_handler(self, evt: Event):
         alert_data: AlertData = evt.data
         if alert_data.is_test:
             logger.debug("Video file not saved (test alert)")
             return
-        ready_for_next_write = self.last_write + self.min_write_interval_s < time.time()
-        if ready_for_next_write:
-            logger.debug("Starting video write task")
-            video_data = list(self.video_deque)
-            self.video_deque.clear()
-            loop = asyncio.get_event_loop()
-            self.pending_writes.append(
-                loop.run_in_executor(
-                    self.executor,
-                    write_video_file,
-                    self.save_path,
-                    video_data,
-                    self.frame_rate,
-                )
-            )
-            self.last_write = time.time()
+        if alert_data.camera_id not in (None, self.camera_id):
+            return
+        now = time.time()
+        if self.recording_until is not None:
+            logger.debug(f"Extending the video recording by {self.post_roll_s}s")
+            self.recording_until = now + self.post_roll_s
+            return
+        ready_for_next_write = self.last_write + self.min_write_interval_s < now
+        if not self.ring.frames:
+            logger.warning("Video file not written, no frames have been captured")
+        elif ready_for_next_write:
+            logger.debug(f"Recording video for {self.post_roll_s}s after the alarm")
+            self.ring.recording = True
+            self.recording_until = now + self.post_roll_s
+            self._finish_recording(now)
         else:
             logger.debug(
                 f"Video file not written, interval_hrs since last write to short({self.min_write_interval_s}s)"
             )
 
+    def _finish_recording(self, now: float) -> None:
+        """Write the video file once the post-roll is over
+
+        Args:
+            now (float): Current time (or frame time stamp).
+        """
+        if self.recording_until is None or now < self.recording_until:
+            return
+        logger.debug("Starting video write task")
+        loop = asyncio.get_event_loop()
+        self.pending_writes.append(
+            loop.run_in_executor(
+                self.executor,
+                write_segments_file,
+                self.save_path,
+                self.ring.take(),
+                self.ring.frame_rate,
+                self.file_prefix,
+            )
+        )
+        self.ring.recording = False
+        self.recording_until = None
+        self.last_write = now
+
     async def run(self):
         check_save_dir_exists(self.save_path)
         self._subscribe()
-        loop = asyncio.get_event_loop()
-        loop.call_soon(file_purge_task, self.save_path, 24)
-        self.frame_rate = await self.determine_frame_rate()
-        logger.debug(f"Calculated frame rate to be {self.frame_rate}")
-        # Add a 50% buffer for future tuning
-        max_length = self.frame_rate * self.min_write_interval_s
-        # Reset the deque to the correct size for the framerate
-        collected = list(self.video_deque)
-        self.video_deque = deque(maxlen=int(max_length))
-        self.video_deque.extend(collected)
+        if self.purge_files:
+            server = self.config.server
+            self.purge_task = asyncio.ensure_future(
+                file_purge_task(
+                    self.save_path,
+                    PURGE_INTERVAL_HRS,
+                    server.video_retention_days,
+                    server.video_max_size_mb * 1024 * 1024,
+                )
+            )
         while True:
+            # Finishes the recording if the camera stopped sending frames
+            self._finish_recording(time.time())
             for task in asyncio.as_completed(self.pending_writes):
                 file_written = await task
                 logger.debug(f"Video file written to {self.save_path}/{file_written}")
             self.pending_writes.clear()
             await asyncio.sleep(1)
 
-    async def determine_frame_rate(self) -> int:
-        capture_duration_s = 10
-        await asyncio.sleep(10)  # Wait for the system to settle
-        self.video_deque.clear()  # Clear the deque before starting
-        await asyncio.sleep(capture_duration_s)
-        assert (
-            len(self.video_deque) > 0
-        ), "The video deque was empty, can't determine frame rate"
-        return int(len(self.video_deque) / capture_duration_s)
+
+def write_segments_file(
+    path: str, segments: List[Segment], fps: float, prefix: str = ""
+) -> str:
+    """Write the frames of segments to a video file and add it to the clip index, then
+    delete the segments
+
+    Args:
+        path (str): Save directory of the video file.
+        segments (List[Segment]): Consecutive segments, owned by the write.
+        fps (float): Frame rate for the video
+        prefix (str): Optional filename prefix.
+
+    Returns:
+        (str): Filename of written file
+    """
+    try:
+        filename = write_video_file(path, read_frames(segments), fps, prefix)
+    finally:
+        remove_segments(segments)
+    try:
+        with ClipIndex(path) as index:
+            size = os.path.getsize(os.path.join(path, filename))
+            index.add(filename, time.time(), size)
+    except sqlite3.Error as ex:
+        # Added by the index sync on the next start up
+        logger.error(f"Couldn't add {filename} to the clip index, {ex}")
+    return filename
 
 
 def write_video_file(
-    path: str,
-    data: List[bytes],
-    fps: int,
-    throttle_time: float | None = None,
+    path: str, data: Iterable[VideoFrame], fps: float, prefix: str = ""
 ) -> str:
-    """Write the bytes data to a video file.
+    """Write the frames to a video file.
+
+    The JPEG images are muxed into a Motion JPEG AVI file as they are, without being
+    decoded or encoded again. Each frame is placed at its time stamp in the constant
+    frame rate video, the last frame is held over gaps (e.g. keyframes only while
+    idle) and frames falling behind by more than a frame are dropped, so the video
+    plays back in real time.
 
     Args:
         path (str): Save directory of the video file.
-        data (List[bytes]): List of consecutive images as bytes.
-        fps (int): Frame rate for the video
-        throttle_time (float | None): Optional CPU throttling delay, if not set the write will be
-        throttled to 1/3 of the frame rate (i.e the total write will take 1/3 of the video duration).
+        data (Iterable[VideoFrame]): Consecutive frames (JPEG images).
+        fps (float): Frame rate for the video, at least 1
+        prefix (str): Optional filename prefix.
     Returns:
         (str): Filename of written file
     """
-    out = None
     now = datetime.now()
-    filename = now.strftime("%Y_%d_%m-%I_%M_%p") + ".avi"
-    try:
-        if throttle_time is None:
-            throttle_time = (1 / fps) / 3.0
-        # read the first frame to check the dimensions
-        mat = cv.imdecode(np.frombuffer(data[0], np.uint8), -1)
-        height, width = mat.shape
-        fourcc = cv.VideoWriter_fourcc(*"MJPG")
-        out = cv.VideoWriter(path + f"/{filename}", fourcc, fps, (width, height))
-        for frame in data:
-            buffer = np.frombuffer(frame, np.uint8)
-            img = cv.imdecode(buffer, cv.IMREAD_COLOR)
-            out.write(img.astype("uint8"))
-            time.sleep(throttle_time)  # Throttle the write if required
-    except KeyboardInterrupt:
-        pass  # TODO: What happens if we get a SIGINT?
-    finally:
-        if out is not None:
-            out.release()
+    filename = prefix + now.strftime("%Y_%d_%m-%I_%M_%p") + ".avi"
+    frames = iter(data)
+    first = next(frames, None)
+    if first is None:
+        raise OverwatchException("Error!, no frames to write to the video file")
+    fps = max(fps, 1.0)
+    width, height = jpeg_size(first.data)
+    with open(os.path.join(path, filename), "wb") as file_handle:
+        writer = AviWriter(file_handle, fps, width, height)
+        writer.write(first.data)
+        for frame in frames:
+            position = round((frame.time_stamp - first.time_stamp) * fps)
+            if position < writer.frames - 1:
+                continue  # More than a frame behind, faster than the frame rate
+            while writer.frames < position:
+                writer.hold()
+            writer.write(frame.data)
+        writer.close()
     return filename
 
 
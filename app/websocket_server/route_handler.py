@@ -1,7 +1,7 @@
 import asyncio
 from contextlib import contextmanager
 import json
-from typing import Awaitable, Dict, Callable
+from typing import Awaitable, Dict, Callable, Optional, Tuple
 from loguru import logger
 from pydantic import ValidationError
 from app.events import Event, Publisher, Topic
@@ -18,6 +18,8 @@ __all__ = [
     "HEALTH_HTTP_ROUTE",
     "SNAPSHOT_HTTP_ROUTE",
     "CONFIG_HTTP_ROUTE",
+    "camera_route",
+    "split_camera_route",
 ]
 
 
@@ -29,6 +31,39 @@ SNAPSHOT_HTTP_ROUTE = "/snapshot"
 CONFIG_HTTP_ROUTE = "/config"
 
 
+# Camera routes, the camera name is appended (e.g "/raw-video/lounge")
+CAMERA_ROUTES = (RAW_VIDEO_ROUTE, SNAPSHOT_HTTP_ROUTE)
+
+
+def camera_route(route: str, camera_id: str) -> str:
+    """Path of a camera route for a camera
+
+    Args:
+        route (str): Camera route (RAW_VIDEO_ROUTE, SNAPSHOT_HTTP_ROUTE)
+        camera_id (str): Camera name
+
+    Returns:
+        str: Route path
+    """
+    return f"{route}/{camera_id}"
+
+
+def split_camera_route(path: str) -> Tuple[str, Optional[str]]:
+    """Split a request path into the route and the camera name
+
+    Args:
+        path (str): Request path
+
+    Returns:
+        Tuple[str, Optional[str]]: Route and the camera name, None if the path has no
+        camera name or isn't a camera route.
+    """
+    route, _, camera_id = path.rpartition("/")
+    if route in CAMERA_ROUTES and camera_id:
+        return route, camera_id
+    return path, None
+
+
 def generate_route_map() -> Dict[str, Handler]:
     return {
         ROOT_ROUTE: root_handler,
@@ -48,7 +83,8 @@ class RouteMap:
         self.not_found_handler = not_found_handler
 
     def get_handler(self, path: str) -> Handler:
-        handler = self.routes.get(path)
+        route, _ = split_camera_route(path)
+        handler = self.routes.get(route)
         return handler or not_found_handler
 
 
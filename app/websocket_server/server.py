@@ -2,6 +2,7 @@ from __future__ import annotations
 import asyncio
 import http
 import time
+from typing import Dict, List, Optional
 from loguru import logger
 from websockets.exceptions import ConnectionClosedError
 import websockets.legacy.server as ws
@@ -16,15 +17,14 @@ from .route_handler import (
     HEALTH_HTTP_ROUTE,
     SNAPSHOT_HTTP_ROUTE,
     CONFIG_HTTP_ROUTE,
+    camera_route,
+    split_camera_route,
 )
 
 __all__ = ["WebSocketServer"]
 
 
 class WebSocketServer:
-
-    SNAPSHOT_INTERVAL = 1.0
-
     def __init__(self, config: AppConfig, publisher: Publisher):
         """Web Socket Server
 
@@ -39,13 +39,15 @@ class WebSocketServer:
         self.clients = ClientList()
         self.routes = RouteMap()
         self._stop = asyncio.Event()
-        self._last_snapshot = time.time()
-        self._snapshot: bytes = b""
+        self._cameras: List[str] = [camera.name for camera in config.camera]
+        self._last_snapshots: Dict[str, float] = {}
+        self._snapshots: Dict[str, bytes] = {}
         self._subscribe()
 
     def _subscribe(self):
         self.pub.subscribe(Topic.SYSTEM_STATUS_UPDATE, self._status_update_handler)
         self.pub.subscribe(Topic.VIDEO_RAW_UPDATE, self._raw_video_update_handler)
+        self.pub.subscribe(Topic.VIDEO_SNAPSHOT_UPDATE, self._snapshot_update_handler)
         self.pub.subscribe(Topic.SYSTEM_METRICS_READY, self._metrics_update_handler)
         self.pub.subscribe(Topic.SYSTEM_SHUTDOWN, self._shutdown_handler)
         self.pub.subscribe(Topic.SYSTEM_CONFIG_UPDATE, self._config_update_handler)
@@ -59,10 +61,15 @@ class WebSocketServer:
         self._broadcast(ROOT_ROUTE, data)
 
     def _raw_video_update_handler(self, evt: Event):
-        if self._last_snapshot + WebSocketServer.SNAPSHOT_INTERVAL < time.time():
-            self._snapshot = evt.data
-            self._last_snapshot = time.time()
-        self._broadcast(RAW_VIDEO_ROUTE, evt.data)
+        camera_id = evt.camera_id or self._cameras[0]
+        self._broadcast(camera_route(RAW_VIDEO_ROUTE, camera_id), evt.data)
+        if camera_id == self._cameras[0]:
+            self._broadcast(RAW_VIDEO_ROUTE, evt.data)
+
+    def _snapshot_update_handler(self, evt: Event):
+        camera_id = evt.camera_id or self._cameras[0]
+        self._snapshots[camera_id] = evt.data
+        self._last_snapshots[camera_id] = time.time()
 
     def _metrics_update_handler(self, evt: Event):
         metrics: MetricsData = evt.data
@@ -72,6 +79,7 @@ class WebSocketServer:
         logger.debug("Websocket server updating configuration")
         new_config: AppConfig = evt.data
         self._config = new_config
+        self._cameras = [camera.name for camera in new_config.camera]
 
     def _broadcast(self, path: str, data: str | bytes) -> None:
         for coro in [
@@ -79,20 +87,36 @@ class WebSocketServer:
         ]:
             asyncio.create_task(coro)
 
+    def _path_camera(self, path: str) -> Optional[str]:
+        """Camera of a camera route path, the first camera if no camera is given
+
+        Returns:
+            Optional[str]: Camera name, None if the camera doesn't exist
+        """
+        _, camera_id = split_camera_route(path)
+        if camera_id is None:
+            return self._cameras[0]
+        return camera_id if camera_id in self._cameras else None
+
     async def http_interceptor(self, path: str, request_headers):
+        route, _ = split_camera_route(path)
         if path == HEALTH_HTTP_ROUTE:
             return http.HTTPStatus.OK, [], b"OK\n"
-        elif path == SNAPSHOT_HTTP_ROUTE:
+        elif route == SNAPSHOT_HTTP_ROUTE:
+            camera_id = self._path_camera(path)
+            if camera_id is None:
+                return http.HTTPStatus.NOT_FOUND, [], b"Camera not found\n"
+            snapshot = self._snapshots.get(camera_id, b"")
             return (
                 http.HTTPStatus.OK,
                 [
                     ("Content-type", "image/jpeg"),
-                    ("Content-length", len(self._snapshot)),
+                    ("Content-length", len(snapshot)),
                     ("Cache-control", "no-cache"),
                     ("Access-Control-Allow-Origin", "*"),
-                    ("Time", self._last_snapshot),
+                    ("Time", self._last_snapshots.get(camera_id, time.time())),
                 ],
-                self._snapshot,
+                snapshot,
             )
         elif path == CONFIG_HTTP_ROUTE:
             return (
@@ -101,20 +125,39 @@ class WebSocketServer:
                     ("Content-type", "application/json"),
                     ("Cache-control", "no-cache"),
                     ("Access-Control-Allow-Origin", "*"),
-                    ("Time", self._last_snapshot),
+                    ("Time", time.time()),
                 ],
                 self._config.json().encode("UTF-8"),
             )
         # Allow WS requests to pass through
 
+    def _publish_live_viewers(self) -> None:
+        viewers = {camera_id: 0 for camera_id in self._cameras}
+        for client in self.clients:
+            route, _ = split_camera_route(client.path)
+            if route == RAW_VIDEO_ROUTE and (
+                camera_id := self._path_camera(client.path)
+            ):
+                viewers[camera_id] += 1
+        for camera_id, count in viewers.items():
+            self.pub.send_message(
+                Topic.VIDEO_VIEWERS_UPDATE, Event(data=count, camera_id=camera_id)
+            )
+
     async def route_handler(self, websocket: ws.WebSocketServerProtocol, path: str):
         client = Client(websocket, path)
         try:
             with self.clients.register(client):
-                handler = self.routes.get_handler(path)
+                self._publish_live_viewers()
+                if self._path_camera(path) is None:
+                    handler = self.routes.not_found_handler
+                else:
+                    handler = self.routes.get_handler(path)
                 await handler(client, self.pub)
         except ConnectionClosedError:
             logger.debug(f"Client disconnected ({client:short})")
+        finally:
+            self._publish_live_viewers()
 
     async def start(self):
         async with ws.serve(
@@ -0,0 +1,112 @@
+#!.venv/bin/python
+"""Benchmark every registered detection algorithm and motion processor on video clips
+
+Each clip is sampled once at the processing frame rate (in video time, as the server
+sees it), then every algorithm/processor pair runs the detection pipeline
+(preprocessing and detection) over the samples as fast as possible. Reports the frames
+per second, the p50/p99 frame latency and the video time of the alarm (-1 if none),
+run from the repository root:
+
+    python scripts/benchmark_detection.py tests/data/motion.avi tests/data/no_motion.avi
+"""
+
+import argparse
+from glob import glob
+from itertools import product
+from pathlib import Path
+import sys
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+
+app_path = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(app_path))
+
+from app.capture.filter import create_filter
+from app.capture.pipeline import FramePipeline
+from app.config import TomlConfigSerializer, load_config_from_file
+from app.datastructures import AppConfig, Flags
+from app.detection import (
+    create_detection_algorithm,
+    detection_algorithms,
+    motion_processors,
+    scale_to_detection_width,
+)
+from app.replay import sample_frames
+
+Frames = List[Tuple[float, np.ndarray]]
+
+
+def load_frames(path: str, fps: int) -> Frames:
+    # Samples reuse the frame, keep a copy of each
+    return [(t, frame.copy()) for t, frame in sample_frames(path, fps)]
+
+
+def variants(config: AppConfig) -> List[Tuple[str, str]]:
+    """Algorithm and motion processor pairs, algorithms that don't use a motion
+    processor only run once"""
+    pairs: List[Tuple[str, str]] = []
+    for name, algorithm in detection_algorithms().items():
+        if algorithm.uses_motion_processor:
+            pairs.extend(product([name], motion_processors()))
+        else:
+            pairs.append((name, config.processing.motion_processor))
+    return pairs
+
+
+def run(config: AppConfig, frames: Frames) -> Dict[str, float]:
+    processing = config.processing
+    pipeline = FramePipeline(
+        create_filter(scale_to_detection_width(processing)),
+        regions=config.camera[0].regions,
+        detection_width=processing.detection_width,
+    )
+    algorithm = create_detection_algorithm(config)
+    latencies = np.empty(len(frames))
+    alarm_time = -1.0
+    start = time.perf_counter()
+    for i, (frame_time, mat) in enumerate(frames):
+        frame_start = time.perf_counter()
+        pipeline.process(mat)
+        alarm = algorithm.update(pipeline.detection_frame(algorithm.input_dtype))
+        latencies[i] = time.perf_counter() - frame_start
+        if alarm and alarm_time < 0:
+            alarm_time = frame_time
+    duration = time.perf_counter() - start
+    return {
+        "fps": len(frames) / duration,
+        "p50 ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99 ms": float(np.percentile(latencies, 99)) * 1000,
+        # Video time of the frame raising the alarm
+        "alarm at s": alarm_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("clips", nargs="*", default=sorted(glob("tests/data/*.avi")))
+    parser.add_argument("--config", default="sample-config.toml")
+    args = parser.parse_args()
+    flags = Flags(
+        config_path=args.config, silent=True, test=True, log_level="error", file=None
+    )
+    base_config = load_config_from_file(flags, TomlConfigSerializer())
+    for clip in args.clips:
+        frames = load_frames(clip, base_config.processing.fps)
+        print(f"{clip} ({len(frames)} frames)")
+        for algorithm, processor in variants(base_config):
+            processing = base_config.processing.copy(
+                update={"algorithm": algorithm, "motion_processor": processor}
+            )
+            config = base_config.copy(update={"processing": processing})
+            results = run(config, frames)
+            label = algorithm
+            if detection_algorithms()[algorithm].uses_motion_processor:
+                label += f"/{processor}"
+            print(
+                f"{label:>24}: " + ", ".join(f"{k} {v:.2f}" for k, v in results.items())
+            )
+
+
+if __name__ == "__main__":
+    main()
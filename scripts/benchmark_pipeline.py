@@ -0,0 +1,146 @@
+#!.venv/bin/python
+"""Benchmark the detection preprocessing and motion detection per frame
+
+Compares the allocating helper functions with the preallocated FramePipeline, the
+float and fixed point motion processors and a downscaled detection width, run from the
+repository root:
+
+    python scripts/benchmark_pipeline.py --frames 500 --width 1280 --height 720
+"""
+
+import argparse
+import gc
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+import numpy as np
+import psutil
+
+app_path = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(app_path))
+
+from app.capture.filter import GuassianBlurFilter
+from app.capture.helpers import resize_mat, to_gray_scale
+from app.capture.pipeline import FramePipeline
+from app.datastructures import ProcessingOptions
+from app.detection import scale_to_detection_width
+from app.detection.basic_detection.basic import (
+    AverageMotionProcessor,
+    FixedPointMotionProcessor,
+)
+
+OPTIONS = ProcessingOptions(
+    fps=2,
+    avg_weighting=0.5,
+    dilation_iterations=0,
+    fixed_lvl_threshold=5,
+    gauss_ksize=7,
+    pixel_threshold_hi=9000,
+    pixel_threshold_lo=15,
+)
+
+
+def allocating_step() -> Callable[[np.ndarray], int]:
+    frame_filter = GuassianBlurFilter(ksize=OPTIONS.gauss_ksize)
+    processor = AverageMotionProcessor()
+
+    def step(mat: np.ndarray) -> int:
+        gray = to_gray_scale(resize_mat(mat))
+        filtered = frame_filter.apply(gray)
+        return processor.detect_motion(np.array(filtered, dtype=np.float32), OPTIONS)
+
+    return step
+
+
+def pipeline_step() -> Callable[[np.ndarray], int]:
+    pipeline = FramePipeline(GuassianBlurFilter(ksize=OPTIONS.gauss_ksize))
+    processor = AverageMotionProcessor()
+
+    def step(mat: np.ndarray) -> int:
+        pipeline.process(mat)
+        return processor.detect_motion(pipeline.detection_frame(), OPTIONS)
+
+    return step
+
+
+def fixed_point_step() -> Callable[[np.ndarray], int]:
+    pipeline = FramePipeline(GuassianBlurFilter(ksize=OPTIONS.gauss_ksize))
+    processor = FixedPointMotionProcessor()
+
+    def step(mat: np.ndarray) -> int:
+        pipeline.process(mat)
+        frame = pipeline.detection_frame(processor.input_dtype)
+        return processor.detect_motion(frame, OPTIONS)
+
+    return step
+
+
+def downscaled_step(width: int = 160) -> Callable[[np.ndarray], int]:
+    options = scale_to_detection_width(OPTIONS.copy(update={"detection_width": width}))
+    pipeline = FramePipeline(
+        GuassianBlurFilter(ksize=options.gauss_ksize), detection_width=width
+    )
+    processor = AverageMotionProcessor()
+
+    def step(mat: np.ndarray) -> int:
+        pipeline.process(mat)
+        return processor.detect_motion(pipeline.detection_frame(), options)
+
+    return step
+
+
+def run(
+    step: Callable[[np.ndarray], int], frames: List[np.ndarray], count: int
+) -> Dict[str, float]:
+    process = psutil.Process()
+    for mat in frames:  # Warm up, allocates the buffers
+        step(mat)
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    rss_start = process.memory_info().rss
+    rss_max = rss_start
+    allocated = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(count):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        step(frames[i % len(frames)])
+        allocated += tracemalloc.get_traced_memory()[1] - current
+        rss_max = max(rss_max, process.memory_info().rss)
+    duration = time.perf_counter() - start
+    tracemalloc.stop()
+    return {
+        "ms/frame": duration / count * 1000,
+        "KiB allocated/frame": allocated / count / 1024,
+        "gc collections": sum(stat["collections"] for stat in gc.get_stats())
+        - collections,
+        "RSS growth KiB": (rss_max - rss_start) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+        for _ in range(8)
+    ]
+    for name, step in (
+        ("allocating", allocating_step),
+        ("pipeline", pipeline_step),
+        ("fixed_point", fixed_point_step),
+        ("downscaled", downscaled_step),
+    ):
+        results = run(step(), frames, args.frames)
+        print(f"{name:>12}: " + ", ".join(f"{k} {v:.2f}" for k, v in results.items()))
+
+
+if __name__ == "__main__":
+    main()
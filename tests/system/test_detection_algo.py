@@ -1,41 +1,51 @@
-from typing import List
 import numpy as np
 import numpy.typing as npt
 import pytest
 from app.datastructures import AppConfig
 from app.detection import BasicDetectionAlgorithm
 from app.capture.filter import GuassianBlurFilter
-from app.capture.device import FileCaptureDevice
-from app.capture.helpers import preprocess_mat
+from app.replay import FrameCache
 
 
 pytestmark = pytest.mark.system
 
 
-def load_video_data(path: str) -> List[npt.NDArray[np.uint8]]:
-    file_cap = FileCaptureDevice(path, loop=False, fps=-1)
-    video = list(file_cap.capture())
-    processed = []
-    for mat in video:
-        mat = preprocess_mat(mat)
-        processed.append(mat)
-    return processed
+@pytest.fixture(scope="session")
+def frame_cache(request: pytest.FixtureRequest) -> FrameCache:
+    # Kept in the pytest cache, so later runs memory map the frames instead of decoding
+    return FrameCache(request.config.cache.mkdir("frames"))
+
+
+def load_video_data(
+    path: str, config: AppConfig, cache: FrameCache
+) -> npt.NDArray[np.uint8]:
+    # Resized and grayscale frames
+    return cache.load(path, config, every_frame=True).frames
 
 
 @pytest.mark.slow
+@pytest.mark.parametrize("motion_processor", ["average", "fixed_point"])
 @pytest.mark.parametrize(
     "video_path, expected",
     [("tests/data/no_motion.avi", False), ("tests/data/motion.avi", True)],
 )
-def test_movement_detection(video_path: str, expected: bool, test_config: AppConfig):
-    algo = BasicDetectionAlgorithm(test_config)
+def test_movement_detection(
+    video_path: str,
+    expected: bool,
+    motion_processor: str,
+    test_config: AppConfig,
+    frame_cache: FrameCache,
+):
+    processing = test_config.processing.copy(
+        update={"motion_processor": motion_processor}
+    )
+    algo = BasicDetectionAlgorithm(test_config.copy(update={"processing": processing}))
     filter_ = GuassianBlurFilter(test_config.processing.gauss_ksize)
-    video_data = load_video_data(video_path)
+    video_data = load_video_data(video_path, test_config, frame_cache)
     motion_detected = False
     for mat in video_data:
         filtered = filter_.apply(mat)
-        mat_as_float = np.array(filtered, dtype=np.float32)
-        motion_detected = algo.update(mat_as_float)
+        motion_detected = algo.update(filtered.astype(algo.input_dtype))
         if motion_detected:
             motion_detected = True
             break
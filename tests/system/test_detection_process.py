@@ -7,7 +7,7 @@ pytestmark = pytest.mark.system
 
 
 def test_detection_process_shutdown(test_config):
-    process = DetectionProcess(test_config)
+    process = DetectionProcess(test_config, test_config.camera[0])
     process.start()
     time.sleep(5)
     process.shutdown()
@@ -0,0 +1,22 @@
+import pytest
+from app.capture.detection_process import assign_cores
+
+
+@pytest.fixture(autouse=True)
+def eight_cores(monkeypatch):
+    monkeypatch.setattr("os.sched_getaffinity", lambda _: set(range(8)), raising=False)
+
+
+@pytest.mark.parametrize(
+    "count, max_cores, expected",
+    [
+        (1, 0, [None]),
+        (1, 8, [None]),
+        (1, 2, [{0, 1}]),
+        (2, 4, [{0, 2}, {1, 3}]),
+        (3, 2, [{0}, {1}, {0}]),
+        (2, 16, [{0, 2, 4, 6}, {1, 3, 5, 7}]),
+    ],
+)
+def test_assign_cores(count, max_cores, expected):
+    assert [assign_cores(i, count, max_cores) for i in range(count)] == expected
@@ -1,7 +1,13 @@
 from collections import deque
+import random
 import numpy as np
 import pytest
+from app.datastructures import AppConfig
+from app.detection import GridDetectionAlgorithm, scale_to_detection_width
 from app.detection.basic_detection.basic import (
+    AverageMotionProcessor,
+    FixedPointMotionProcessor,
+    MotionHistory,
     is_in_alarm,
     bandpass_filter,
     raise_alert,
@@ -40,6 +46,67 @@ def test_is_in_alarm(data, min_move_s, expected):
     assert actual == expected
 
 
+@pytest.mark.parametrize(
+    "length, min_move_s", [(180, 10), (10, 10), (5, 10), (11, 10), (20, 1), (3, 0)]
+)
+def test_motion_history_matches_is_in_alarm(length, min_move_s):
+    rng = random.Random(length * 100 + min_move_s)
+    data = deque([0] * length, maxlen=length)
+    history = MotionHistory(length, min_move_s)
+    assert history.in_alarm() == is_in_alarm(data, min_move_s)
+    for probability in (0.05, 0.5, 0.95):
+        for _ in range(3 * length):
+            motion = rng.random() < probability
+            data.appendleft(int(motion))
+            history.append(motion)
+            assert history.in_alarm() == is_in_alarm(data, min_move_s)
+            assert history.motion_count == sum(data)
+    assert list(history) == list(data)
+
+
+def test_fixed_point_matches_average(test_config: AppConfig):
+    rng = np.random.default_rng(0)
+    average, fixed_point = AverageMotionProcessor(), FixedPointMotionProcessor()
+    background = rng.integers(0, 255, (120, 160), dtype=np.uint8)
+    for i in range(30):
+        frame = background.copy()
+        frame[40:80, i * 4 : i * 4 + 30] = 255  # Moving block
+        noise = rng.integers(0, 4, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        as_float = frame.astype(np.float32)
+        expected = average.detect_motion(as_float, test_config.processing)
+        actual = fixed_point.detect_motion(frame, test_config.processing)
+        assert actual == pytest.approx(expected, abs=max(2, expected * 0.01))
+
+
+@pytest.mark.parametrize(
+    "width, expected", [(640, (100, 9000, 5)), (320, (25, 2250, 3)), (160, (6, 562, 1))]
+)
+def test_scale_to_detection_width(test_config: AppConfig, width, expected):
+    options = test_config.processing.copy(update={"detection_width": width})
+    scaled = scale_to_detection_width(options)
+    assert (
+        scaled.pixel_threshold_lo,
+        scaled.pixel_threshold_hi,
+        scaled.gauss_ksize,
+    ) == expected
+
+
 @pytest.mark.skip
 def test_raise_alert():
     ...
+
+
+def test_grid_motion_energy(test_config: AppConfig):
+    processing = test_config.processing.copy(
+        update={"algorithm": "grid", "grid_shape": (2, 4)}
+    )
+    config = test_config.copy(update={"processing": processing})
+    algorithm = GridDetectionAlgorithm(config)
+    frame = np.zeros((120, 160), dtype=np.uint8)
+    algorithm.update(frame)
+    assert algorithm.grid_processor.detect_motion(frame, processing) == 0
+    moved = frame.copy()
+    moved[60:120, 120:160] = 255  # Bottom right cell
+    assert algorithm.grid_processor.detect_motion(moved, processing) == 60 * 40
+    assert algorithm.motion_energy == [[0.0] * 4, [0.0, 0.0, 0.0, 1.0]]
@@ -1,8 +1,9 @@
 from pathlib import Path
 from unittest.mock import Mock
+from pydantic import ValidationError
 import pytest
 from app.exceptions import ConfigFileNotFound
-from app.datastructures import Flags
+from app.datastructures import AppConfig, DEFAULT_CAMERA, Flags
 from app.config import (
     load_config_from_file,
     save_config_to_file,
@@ -62,3 +63,52 @@ class TestTomlConfigSerializer:
                 test=True,
             )
             load_config_from_file(_flags, TomlConfigSerializer())
+
+
+class TestCameraConfig:
+    def test_single_camera_table(self, test_config):
+        config_dict = test_config.dict(exclude={"flags"})
+        config_dict["camera"] = {"url": "http://192.168.1.1/video.mjpeg"}
+        config = AppConfig(**config_dict, flags=test_config.flags)
+        assert [camera.name for camera in config.camera] == [DEFAULT_CAMERA]
+
+    def test_named_cameras(self, test_config):
+        config_dict = test_config.dict(exclude={"flags"})
+        config_dict["camera"] = [
+            {"name": "lounge", "url": "http://192.168.1.1/video.mjpeg"},
+            {"name": "bedroom", "url": "http://192.168.1.2/video.mjpeg"},
+        ]
+        config = AppConfig(**config_dict, flags=test_config.flags)
+        assert [camera.name for camera in config.camera] == ["lounge", "bedroom"]
+
+    @pytest.mark.parametrize("names", [["one", "one"], ["bad/name"], []])
+    def test_invalid_cameras(self, test_config, names):
+        config_dict = test_config.dict(exclude={"flags"})
+        config_dict["camera"] = [{"name": name, "url": "rtsp://x"} for name in names]
+        with pytest.raises(ValidationError):
+            AppConfig(**config_dict, flags=test_config.flags)
+
+    @pytest.mark.parametrize(
+        "points", [[[0, 0], [1, 1]], [[0, 0], [1, 0], [1, 1.5]], [[0, 0], [1, 0], [1]]]
+    )
+    def test_invalid_regions(self, test_config, points):
+        config_dict = test_config.dict(exclude={"flags"})
+        config_dict["camera"] = {"url": "rtsp://x", "regions": [{"points": points}]}
+        with pytest.raises(ValidationError):
+            AppConfig(**config_dict, flags=test_config.flags)
+
+
+class TestProcessingConfig:
+    @pytest.mark.parametrize("interval", [0, -1.0, 30.0])
+    def test_invalid_keyframe_interval(self, test_config, interval):
+        config_dict = test_config.dict(exclude={"flags"})
+        config_dict["processing"]["keyframe_interval_s"] = interval
+        with pytest.raises(ValidationError):
+            AppConfig(**config_dict, flags=test_config.flags)
+
+    @pytest.mark.parametrize("field", ["algorithm", "motion_processor"])
+    def test_unknown_detection_names(self, test_config, field):
+        config_dict = test_config.dict(exclude={"flags"})
+        config_dict["processing"][field] = "unknown"
+        with pytest.raises(ValidationError):
+            AppConfig(**config_dict, flags=test_config.flags)
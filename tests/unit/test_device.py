@@ -0,0 +1,107 @@
+import threading
+import cv2 as cv
+import numpy as np
+import pytest
+from app.capture.device import CameraCaptureDevice, PrefetchReader
+from app.exceptions import CaptureError
+
+
+class TestPrefetchReader:
+    def test_frames_in_order(self):
+        frames = iter(range(3))
+
+        def read():
+            try:
+                i = next(frames)
+            except StopIteration as ex:
+                raise CaptureError() from ex
+            return float(i), np.full((1, 1), i, dtype=np.uint8)
+
+        reader = PrefetchReader(read, max_frames=8)
+        received = []
+        with pytest.raises(CaptureError):
+            for frame_time, mat in reader.frames():
+                received.append((frame_time, int(mat[0, 0])))
+        assert received == [(0.0, 0), (1.0, 1), (2.0, 2)]
+
+    def test_oldest_frames_dropped(self):
+        first_received = threading.Event()
+        all_read = threading.Event()
+        release = threading.Event()
+        count = 0
+
+        def read():
+            nonlocal count
+            if count == 1:
+                first_received.wait()
+            if count == 5:
+                all_read.set()
+                release.wait()
+                raise CaptureError()
+            count += 1
+            return float(count)
+
+        reader = PrefetchReader(read, max_frames=2)
+        frames = reader.frames()
+        received = []
+        with pytest.raises(CaptureError):
+            for frame_time in frames:
+                received.append(frame_time)
+                if len(received) == 1:
+                    first_received.set()
+                    all_read.wait()
+                    release.set()
+        # Frames read while the consumer was busy overwrite the oldest buffered frames
+        assert received == [1.0, 4.0, 5.0]
+
+    def test_exit_called_by_thread(self):
+        exited = threading.Event()
+
+        def read():
+            raise CaptureError()
+
+        reader = PrefetchReader(read, max_frames=2, on_exit=exited.set)
+        with pytest.raises(CaptureError):
+            next(reader.frames())
+        assert exited.wait(1.0)
+
+    def test_blocked_reader_not_joined(self):
+        blocked = threading.Event()
+        unblock = threading.Event()
+        exited = threading.Event()
+
+        def read():
+            if blocked.is_set():
+                unblock.wait()  # Stalled stream
+            blocked.set()
+            return 0.0
+
+        reader = PrefetchReader(
+            read, max_frames=2, join_timeout_s=0.1, on_exit=exited.set
+        )
+        frames = reader.frames()
+        next(frames)
+        blocked.wait()
+        frames.close()
+        assert reader.running and not exited.is_set()
+        # The stalled thread releases its own resources once the read returns
+        unblock.set()
+        assert exited.wait(1.0)
+
+
+class TestCameraCaptureDevice:
+    def test_prefetched_frames_not_required_skipped(self, tmp_path):
+        path = str(tmp_path / "clip.avi")
+        writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"MJPG"), 10, (16, 16))
+        for i in range(6):
+            writer.write(np.full((16, 16, 3), i * 40, dtype=np.uint8))
+        writer.release()
+        required = iter([False, True] * 3)
+        device = CameraCaptureDevice(path, prefetch_frames=8)
+        received = []
+        with pytest.raises(CaptureError):
+            for _ in device.capture(lambda: next(required)):
+                received.append(device.frame_time)
+        # Every frame is read by the thread, the consumer only yields required frames
+        assert len(received) == 3
+        assert len(device.pop_read_times()) == 6
@@ -0,0 +1,118 @@
+import multiprocessing as mp
+import pickle
+import time
+import pytest
+from app.capture.bounded_queue import BoundedQueue
+from app.capture.detection_process import (
+    DetectionProcess,
+    LIVE_STREAM,
+    RECORDING_STREAM,
+)
+from app.capture.frame_buffer import SharedFrameBuffer
+from app.datastructures import QueueStats, VideoFrame
+from app.exceptions import FrameBufferError
+
+
+@pytest.fixture
+def frame_buffer():
+    buffer = SharedFrameBuffer(slots=4, slot_size=16)
+    yield buffer
+    buffer.close()
+
+
+class TestSharedFrameBuffer:
+    def test_empty_buffer(self, frame_buffer: SharedFrameBuffer):
+        assert frame_buffer.latest_seq == 0
+        assert frame_buffer.latest() is None
+
+    def test_write_read(self, frame_buffer: SharedFrameBuffer):
+        seq = frame_buffer.write(b"frame", time_stamp=12.5)
+        slot = frame_buffer.latest()
+        assert slot is not None
+        assert slot.seq == seq == 1
+        assert slot.time_stamp == 12.5
+        assert slot.data == b"frame"
+        slot.data.release()
+
+    def test_overwritten_frames_are_not_returned(self, frame_buffer: SharedFrameBuffer):
+        for i in range(6):
+            frame_buffer.write(bytes([i]))
+        assert frame_buffer.read_frame(1) is None
+        assert frame_buffer.read_frame(6).data == bytes([5])
+
+    def test_frame_too_large(self, frame_buffer: SharedFrameBuffer):
+        with pytest.raises(FrameBufferError):
+            frame_buffer.write(bytes(17))
+
+    def test_attach_from_pickle(self, frame_buffer: SharedFrameBuffer):
+        writer = pickle.loads(pickle.dumps(frame_buffer))
+        writer.write(b"child")
+        assert frame_buffer.read_frame(1).data == b"child"
+        writer.close()
+
+
+class TestDrainFrames:
+    @pytest.fixture
+    def process(self, test_config):
+        process = DetectionProcess(test_config, test_config.camera[0])
+        yield process
+        for frame_buffer in process.frame_buffers.values():
+            frame_buffer.close()
+
+    def test_drain_all_unread(self, process: DetectionProcess):
+        frame_buffer = process.frame_buffers[RECORDING_STREAM]
+        for i in range(3):
+            frame_buffer.write(bytes([i]), time_stamp=i)
+        expected = [VideoFrame(i, bytes([i])) for i in range(3)]
+        assert process.get_video_frames(RECORDING_STREAM) == (expected, 0)
+        assert process.get_video_frames(RECORDING_STREAM) == ([], 0)
+
+    def test_drain_counts_overwritten(self, process: DetectionProcess):
+        frame_buffer = process.frame_buffers[LIVE_STREAM]
+        for i in range(frame_buffer.slots + 5):
+            frame_buffer.write(bytes([i]))
+        frames, dropped = process.get_video_frames(LIVE_STREAM)
+        assert len(frames) == frame_buffer.slots
+        assert dropped == 5
+
+
+class TestFullBufferPolicy:
+    def test_drop_oldest(self):
+        buffer = SharedFrameBuffer(slots=2, slot_size=1, policy="drop_oldest")
+        for i in range(3):
+            buffer.write(bytes([i]))
+        assert buffer.stats == QueueStats(drops=1, high_water=2)
+        assert buffer.read_frame(3).data == b"\x02"
+        buffer.close()
+
+    def test_drop_newest(self):
+        buffer = SharedFrameBuffer(slots=2, slot_size=1, policy="drop_newest")
+        assert buffer.write(b"\x00") == 1
+        assert buffer.write(b"\x01") == 2
+        assert buffer.write(b"\x02") is None
+        buffer.mark_read(2)
+        assert buffer.write(b"\x03") == 3
+        assert buffer.stats.drops == 1
+        buffer.close()
+
+
+class TestBoundedQueue:
+    def test_drop_oldest(self):
+        queue: BoundedQueue[int] = BoundedQueue(
+            mp.get_context("spawn"), 2, "drop_oldest"
+        )
+        for i in range(3):
+            queue.put(i)
+        assert queue.stats == QueueStats(drops=1, high_water=2)
+        time.sleep(0.1)  # Let the feeder thread flush
+        assert queue.get_nowait() == 1
+
+    def test_drop_newest(self):
+        queue: BoundedQueue[int] = BoundedQueue(
+            mp.get_context("spawn"), 2, "drop_newest"
+        )
+        for i in range(3):
+            queue.put(i)
+        assert queue.stats.drops == 1
+        time.sleep(0.1)  # Let the feeder thread flush
+        assert queue.get_nowait() == 0
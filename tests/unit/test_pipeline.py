@@ -0,0 +1,59 @@
+import numpy as np
+from app.capture.filter import GuassianBlurFilter
+from app.capture.helpers import region_mask, resize_mat, to_gray_scale
+from app.capture.pipeline import FramePipeline
+from app.datastructures import Region
+
+
+def test_pipeline_reuses_buffers():
+    frame_filter = GuassianBlurFilter(ksize=5)
+    pipeline = FramePipeline(frame_filter)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(2)]
+    colour, gray = pipeline.process(frames[0])
+    detection = pipeline.detection_frame()
+    for mat in frames:
+        next_colour, next_gray = pipeline.process(mat)
+        next_detection = pipeline.detection_frame()
+        assert next_colour is colour and next_gray is gray
+        assert next_detection is detection
+        expected_gray = to_gray_scale(resize_mat(mat))
+        assert gray.shape == (360, 640)
+        assert np.array_equal(gray, expected_gray)
+        assert np.array_equal(detection, frame_filter.apply(expected_gray))
+
+
+def test_pipeline_reallocates_on_size_change():
+    pipeline = FramePipeline(GuassianBlurFilter(ksize=5), width=320)
+    _, gray = pipeline.process(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert gray.shape == (240, 320)
+    _, gray = pipeline.process(np.zeros((720, 1280, 3), dtype=np.uint8))
+    assert gray.shape == (180, 320)
+
+
+def test_pipeline_crops_and_masks_regions():
+    regions = [
+        Region(points=((0.5, 0.0), (1.0, 0.0), (1.0, 1.0), (0.5, 1.0))),
+        Region(points=((0.75, 0.0), (1.0, 0.0), (1.0, 0.5)), mode="exclude"),
+    ]
+    pipeline = FramePipeline(GuassianBlurFilter(ksize=5), width=320, regions=regions)
+    pipeline.process(np.full((480, 640, 3), 128, dtype=np.uint8))
+    detection = pipeline.detection_frame(np.uint8)
+    # The right half, less the excluded top right corner
+    assert detection.shape == (240, 160)
+    assert detection[200, 10] == 128
+    assert detection[5, 155] == 0
+
+
+def test_region_mask():
+    exclude = Region(points=((0.0, 0.0), (1.0, 0.0), (0.0, 1.0)), mode="exclude")
+    assert np.all(region_mask([], (10, 10)) == 255)
+    mask = region_mask([exclude], (10, 10))
+    assert mask[0, 0] == 0 and mask[9, 9] == 255
+
+
+def test_pipeline_detection_width():
+    pipeline = FramePipeline(GuassianBlurFilter(ksize=3), detection_width=160)
+    colour, gray = pipeline.process(np.zeros((720, 1280, 3), dtype=np.uint8))
+    assert colour.shape == (360, 640, 3) and gray.shape == (360, 640)
+    assert pipeline.detection_frame().shape == (90, 160)
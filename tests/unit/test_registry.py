@@ -0,0 +1,35 @@
+import pytest
+from app.datastructures import AppConfig
+from app.detection import (
+    AverageMotionProcessor,
+    BasicDetectionAlgorithm,
+    FixedPointMotionProcessor,
+    create_detection_algorithm,
+    detection_algorithms,
+    motion_processors,
+)
+from app.exceptions import AlgorithmNotFound
+
+
+def test_registered_implementations():
+    assert detection_algorithms()["basic"] is BasicDetectionAlgorithm
+    assert motion_processors()["average"] is AverageMotionProcessor
+    assert motion_processors()["fixed_point"] is FixedPointMotionProcessor
+
+
+def test_create_selected_algorithm(test_config: AppConfig):
+    processing = test_config.processing.copy(update={"motion_processor": "fixed_point"})
+    algorithm = create_detection_algorithm(
+        test_config.copy(update={"processing": processing})
+    )
+    assert isinstance(algorithm, BasicDetectionAlgorithm)
+    assert isinstance(algorithm.motion_processor, FixedPointMotionProcessor)
+
+
+@pytest.mark.parametrize(
+    "update", [{"algorithm": "unknown"}, {"motion_processor": "unknown"}]
+)
+def test_unknown_names(test_config: AppConfig, update):
+    processing = test_config.processing.copy(update=update)
+    with pytest.raises(AlgorithmNotFound):
+        create_detection_algorithm(test_config.copy(update={"processing": processing}))
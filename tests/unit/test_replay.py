@@ -0,0 +1,50 @@
+from pathlib import Path
+import cv2 as cv
+import numpy as np
+from app.datastructures import AppConfig
+from app.replay import FrameCache, replay_file
+
+
+def write_clip(path: Path, still_s: int, moving_s: int, fps: int = 10) -> None:
+    writer = cv.VideoWriter(str(path), cv.VideoWriter_fourcc(*"MJPG"), fps, (320, 240))
+    for i in range((still_s + moving_s) * fps):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        x = (i * 20) % 280 if i >= still_s * fps else 0
+        frame[110:130, x : x + 10] = 255
+        writer.write(frame)
+    writer.release()
+
+
+def test_replay_file(tmp_path: Path, test_config: AppConfig):
+    path = tmp_path / "clip.avi"
+    write_clip(path, still_s=3, moving_s=5)
+    alerting = test_config.alerting.copy(
+        update={"alert_time_s": 3, "min_movement_s": 1}
+    )
+    result = replay_file(str(path), test_config.copy(update={"alerting": alerting}))
+    assert result.frames == 80
+    assert result.duration_s == 8.0
+    assert result.motion == [0, 0, 0, 1, 1, 1, 1, 1]
+    # Raised by the last frame of the second motion second
+    assert result.alarms == [4.5]
+
+
+def test_frame_cache(tmp_path: Path, test_config: AppConfig):
+    path = tmp_path / "clip.avi"
+    write_clip(path, still_s=1, moving_s=2)
+    cache = FrameCache(tmp_path / "cache")
+    first = cache.load(str(path), test_config)
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 1
+    second = cache.load(str(path), test_config)
+    assert isinstance(second.frames, np.memmap)
+    assert np.array_equal(first.frames, second.frames)
+    assert second.times == first.times
+    assert second.info.frames == 30
+    # Replaying from the cache matches decoding the file
+    uncached = replay_file(str(path), test_config)
+    cached = replay_file(str(path), test_config, cache=cache)
+    assert (cached.frames, cached.motion, cached.alarms) == (
+        uncached.frames,
+        uncached.motion,
+        uncached.alarms,
+    )
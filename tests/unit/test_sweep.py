@@ -0,0 +1,35 @@
+from pathlib import Path
+import cv2 as cv
+import numpy as np
+from app.datastructures import AppConfig
+from app.tuning import Clip, count_clip, parameter_sets, raises_alarm
+
+
+def test_parameter_sets():
+    space = {"gauss_ksize": [5, 7], "avg_weighting": [0.3, 0.5, 0.7]}
+    sets = parameter_sets(space)
+    assert len(sets) == 6
+    assert {"gauss_ksize": 7, "avg_weighting": 0.3} in sets
+    sampled = parameter_sets(space, samples=3, seed=1)
+    assert len(sampled) == 3 and all(sample in sets for sample in sampled)
+
+
+def test_count_clip_shares_preprocessing(tmp_path: Path, test_config: AppConfig):
+    path = tmp_path / "clip.avi"
+    writer = cv.VideoWriter(str(path), cv.VideoWriter_fourcc(*"MJPG"), 10, (320, 240))
+    for i in range(40):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        frame[110:130, i * 5 : i * 5 + 10] = 255
+        writer.write(frame)
+    writer.release()
+    keys = [(5, 0.5, 5), (7, 0.5, 5), (5, 0.3, 5)]
+    counts = count_clip(Clip(str(path), True), test_config, keys)
+    assert set(counts.counts) == set(keys)
+    assert all(len(values) == 8 for values in counts.counts.values())
+    parameters = {"pixel_threshold_lo": 100, "pixel_threshold_hi": 9000}
+    alerting = test_config.alerting.copy(update={"alert_time_s": 3})
+    config = test_config.copy(update={"alerting": alerting})
+    assert raises_alarm(
+        counts.counts[keys[0]], config, {**parameters, "min_movement_s": 1}
+    )
+    assert not raises_alarm([0] * 8, config, {**parameters, "min_movement_s": 1})
@@ -0,0 +1,155 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+import cv2 as cv
+import numpy as np
+import pytest
+from app.datastructures import AlertData, AppConfig, VideoFrame
+from app.events import Event, Publisher, Topic
+from app.recording import ClipIndex, SegmentRing, purge_clips, read_frames
+from app.recording.segments import SEGMENT_S
+from app.video_grabber import VideoGrabber, write_video_file
+
+
+@pytest.mark.parametrize(
+    "intervals, expected",
+    [
+        ([0.1] * 10, 10.0),
+        # Keyframes only while idle then back to the camera rate
+        ([1.0] * 30 + [0.1] * 50, 10.0),
+        ([0.1] * 50 + [1.0] * 50, 1.0),
+    ],
+)
+def test_frame_rate_average(tmp_path: Path, intervals, expected):
+    ring = SegmentRing(tmp_path, duration_s=60.0, max_bytes=1 << 20)
+    time_stamp = 0.0
+    ring.append(VideoFrame(time_stamp, b""))
+    for interval in intervals:
+        time_stamp += interval
+        ring.append(VideoFrame(time_stamp, b""))
+    assert ring.frame_rate == pytest.approx(expected, rel=0.05)
+
+
+def test_pre_roll_trimmed_by_time(tmp_path: Path, test_config: AppConfig):
+    server = test_config.server.copy(update={"video_save_dir": str(tmp_path)})
+    config = test_config.copy(update={"server": server})
+    camera = config.camera[0]
+    grabber = VideoGrabber(config, Publisher(), Mock(), camera)
+    last = int(grabber.min_write_interval_s) + 25
+    grabber._record_video_update_handler(  # pylint: disable=protected-access
+        Event(
+            data=[VideoFrame(float(t), b"%d" % t) for t in range(last + 1)],
+            camera_id=camera.name,
+        )
+    )
+    # Whole segments are trimmed, the oldest segment still overlaps the window
+    oldest = last - grabber.min_write_interval_s
+    first = grabber.ring.segments[0]
+    assert first.start_time <= oldest <= first.end_time
+    assert first.start_time > oldest - SEGMENT_S
+    segments = grabber.ring.take()
+    assert len(list(tmp_path.glob(f".segments/{camera.name}/*"))) == len(segments)
+    frames = list(read_frames(segments))
+    assert frames[0] == VideoFrame(first.start_time, b"%d" % first.start_time)
+    assert frames[-1] == VideoFrame(float(last), b"%d" % last)
+
+
+def test_pre_roll_byte_budget(tmp_path: Path):
+    ring = SegmentRing(tmp_path, duration_s=60.0, max_bytes=8000)
+    for t in range(60):
+        ring.append(VideoFrame(float(t), bytes(500)))
+    # 1000 byte segments are trimmed to the budget, well short of the duration
+    assert ring.size <= 8000
+    assert ring.size == sum(segment.size for segment in ring.segments)
+    assert ring.segments[0].start_time == 44.0
+    size = ring.size
+    ring.take()
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) == size
+
+
+def test_write_video_file(tmp_path: Path):
+    # Odd sized frames exercise the chunk padding, the 1s gap is held
+    time_stamps = [i / 5 for i in range(10)] + [3.0 + i / 5 for i in range(10)]
+    images = [np.full((75, 101, 3), i * 10, dtype=np.uint8) for i in range(20)]
+    frames = [
+        VideoFrame(time_stamp, cv.imencode(".jpg", image)[1].tobytes())
+        for time_stamp, image in zip(time_stamps, images)
+    ]
+    filename = write_video_file(str(tmp_path), frames, 5, prefix="lounge_")
+    assert filename.startswith("lounge_")
+    cap = cv.VideoCapture(str(tmp_path / filename))
+    assert cap.get(cv.CAP_PROP_FRAME_COUNT) == 25
+    assert cap.get(cv.CAP_PROP_FPS) == 5
+    for i, time_stamp in enumerate(time_stamps):
+        ret, mat = cap.read()
+        assert ret
+        assert cap.get(cv.CAP_PROP_POS_MSEC) == pytest.approx(time_stamp * 1000)
+        assert mat.shape == (75, 101, 3)
+        assert abs(int(mat[0, 0, 0]) - i * 10) <= 2
+    cap.release()
+
+
+def test_post_roll_extended_by_alarms(
+    tmp_path: Path, test_config: AppConfig, monkeypatch: pytest.MonkeyPatch
+):
+    server = test_config.server.copy(update={"video_save_dir": str(tmp_path)})
+    alerting = test_config.alerting.copy(update={"post_roll_s": 5})
+    config = test_config.copy(update={"server": server, "alerting": alerting})
+    clock = SimpleNamespace(time=lambda: 100.0)
+    monkeypatch.setattr("app.video_grabber.time", clock)
+    image = cv.imencode(".jpg", np.zeros((48, 64, 3), dtype=np.uint8))[1].tobytes()
+
+    async def record():
+        publisher = Publisher()
+        with ThreadPoolExecutor() as executor:
+            grabber = VideoGrabber(config, publisher, executor, config.camera[0])
+            grabber._subscribe()  # pylint: disable=protected-access
+
+            def send_frames(start: int, end: int):
+                frames = [VideoFrame(float(t), image) for t in range(start, end)]
+                publisher.send_message(
+                    Topic.VIDEO_RECORD_UPDATE, Event(frames, config.camera[0].name)
+                )
+
+            alarm = Event(AlertData("alarm", False, []))
+            send_frames(90, 101)
+            publisher.send_message(Topic.SYSTEM_ALARM, alarm)
+            send_frames(101, 105)
+            clock.time = lambda: 104.0
+            publisher.send_message(Topic.SYSTEM_ALARM, alarm)
+            send_frames(105, 109)
+            assert not grabber.pending_writes
+            send_frames(109, 110)
+            assert len(grabber.pending_writes) == 1
+            filename = await grabber.pending_writes[0]
+        assert not grabber.ring.recording and not grabber.ring.segments
+        return filename
+
+    filename = asyncio.run(record())
+    cap = cv.VideoCapture(str(tmp_path / filename))
+    assert cap.get(cv.CAP_PROP_FRAME_COUNT) == 20
+    cap.release()
+
+
+def test_purge_clips(tmp_path: Path):
+    now = time.time()
+    # Saved before the index existed
+    (tmp_path / "old.avi").write_bytes(bytes(100))
+    os.utime(tmp_path / "old.avi", (now - 10 * 86400, now - 10 * 86400))
+    with ClipIndex(tmp_path) as index:
+        index.sync()
+        for age_days, name in enumerate(["c.avi", "b.avi", "a.avi"]):
+            (tmp_path / name).write_bytes(bytes(100))
+            index.add(name, now - age_days * 86400, 100)
+        # Deleted by hand
+        index.add("gone.avi", now - 8 * 86400, 100)
+    removed = purge_clips(tmp_path, delete_after_days=7, max_bytes=250)
+    # Expired by age oldest first, then the oldest over the size cap
+    assert removed == ["old.avi", "gone.avi", "a.avi"]
+    assert sorted(path.name for path in tmp_path.glob("*.avi")) == ["b.avi", "c.avi"]
+    with ClipIndex(tmp_path) as index:
+        assert index.expired(now + 1) == ["b.avi", "c.avi"]